@@ -2,7 +2,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 
-from .models import Attendance, SiteSettings, AttendancePhoto, PsychologicalProfile
+from .models import Attendance, SiteSettings, AttendancePhoto, PsychologicalProfile, RecognitionEvent
 
 
 @admin.register(Attendance)
@@ -40,6 +40,23 @@ class AttendancePhotoAdmin(admin.ModelAdmin):
         return "No image"
     image_tag.short_description = "Surat"
 
+@admin.register(RecognitionEvent)
+class RecognitionEventAdmin(admin.ModelAdmin):
+    list_display = ('user', 'camera_id', 'ts', 'distance', 'track_id', 'hits')
+    list_filter = ('date', 'camera_id')
+    search_fields = ('user__full_name', 'user__username')
+    date_hierarchy = 'date'
+    ordering = ('-ts',)
+    list_select_related = ('user',)
+
+    def has_add_permission(self, request):
+        # Jurnal faqat kamera orqali to‘ldiriladi
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        # Append-only
+        return False
+
 @admin.register(PsychologicalProfile)
 class PsychologicalProfileAdmin(admin.ModelAdmin):
     list_display = ('attendance', 'dominant_emotion', 'mood_score', 'stress_level', 'updated_at')
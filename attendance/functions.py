@@ -0,0 +1,34 @@
+# attendance/functions.py — davomat so‘rovlari uchun DB funksiyalari
+from django.db.models import Func, IntegerField
+
+
+class MinutesBetween(Func):
+    """
+    Ikki vaqt orasidagi to‘liq daqiqalar (pastga yaxlitlangan) — SQL ichida hisoblanadi.
+    MinutesBetween(F('entry_time'), Value(now)) → UPDATE ... SET duration_minutes = ...
+    """
+    arity = 2
+    output_field = IntegerField()
+
+    def _compile_sides(self, compiler, connection):
+        start, end = self.get_source_expressions()
+        start_sql, start_params = compiler.compile(start)
+        end_sql, end_params = compiler.compile(end)
+        return (start_sql, tuple(start_params)), (end_sql, tuple(end_params))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        # PostgreSQL
+        (start, start_params), (end, end_params) = self._compile_sides(compiler, connection)
+        return f"FLOOR(EXTRACT(EPOCH FROM ({end} - {start})) / 60)::integer", end_params + start_params
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        (start, start_params), (end, end_params) = self._compile_sides(compiler, connection)
+        return f"CAST((julianday({end}) - julianday({start})) * 1440 AS INTEGER)", end_params + start_params
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        (start, start_params), (end, end_params) = self._compile_sides(compiler, connection)
+        return f"TIMESTAMPDIFF(MINUTE, {start}, {end})", start_params + end_params
+
+    def as_oracle(self, compiler, connection, **extra_context):
+        (start, start_params), (end, end_params) = self._compile_sides(compiler, connection)
+        return f"FLOOR((CAST({end} AS DATE) - CAST({start} AS DATE)) * 1440)", end_params + start_params
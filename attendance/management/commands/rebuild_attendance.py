@@ -0,0 +1,66 @@
+# attendance/management/commands/rebuild_attendance.py
+#
+# Misol:
+#   python manage.py rebuild_attendance 2026-10-18
+#   python manage.py rebuild_attendance 2026-10-18 --dry-run
+#
+# Attendance — RecognitionEvent jurnalining yig‘indisi. Xato tufayli buzilgan kunni jurnaldan
+# qayta hisoblaydi: entry_time = birinchi, last_seen = oxirgi hodisa. exit_time, duration_minutes
+# va is_present auto-exit tomonidan boshqariladi → bu yerda tegilmaydi. Jurnalda yo‘q
+# foydalanuvchilar uchun yangi yozuv yaratiladi, mavjud ortiqcha yozuvlar o‘chirilmaydi.
+
+from datetime import date as date_cls
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min
+
+from attendance.models import Attendance, RecognitionEvent
+
+BULK_BATCH = 500
+
+
+class Command(BaseCommand):
+    help = "Bir kunlik davomatni (kirish / oxirgi ko‘rinish) tanish jurnalidan qayta hisoblaydi"
+
+    def add_arguments(self, parser):
+        parser.add_argument("date", help="YYYY-MM-DD")
+        parser.add_argument("--dry-run", action="store_true", help="Faqat farqlarni ko‘rsatadi")
+
+    def handle(self, *args, **options):
+        try:
+            date = date_cls.fromisoformat(options["date"])
+        except ValueError:
+            raise CommandError(f"Noto‘g‘ri sana: {options['date']}")
+
+        spans = {
+            row["user_id"]: (row["first"], row["last"])
+            for row in RecognitionEvent.objects.filter(date=date)
+            .values("user_id").annotate(first=Min("ts"), last=Max("ts"))
+        }
+        if not spans:
+            raise CommandError(f"{date} uchun tanish hodisalari yo‘q")
+
+        existing = {att.user_id: att for att in Attendance.objects.filter(date=date, user_id__in=list(spans))}
+        missing = [user_id for user_id in spans if user_id not in existing]
+        changed = [
+            user_id for user_id, att in existing.items()
+            if (att.entry_time, att.last_seen) != spans[user_id]
+        ]
+        self.stdout.write(f"{date}: {len(spans)} foydalanuvchi, {len(changed)} tuzatiladi, {len(missing)} yaratiladi")
+        if options["dry_run"]:
+            return
+
+        with transaction.atomic():
+            # bulk_create auto_now ni qo‘llaydi (last_seen = hozir) → avval yaratiladi,
+            # keyin barcha vaqtlar bulk_update bilan yoziladi (u auto_now ni chetlab o‘tadi)
+            Attendance.objects.bulk_create(
+                [Attendance(user_id=user_id, date=date, is_present=False) for user_id in missing],
+                batch_size=BULK_BATCH,
+                ignore_conflicts=True,
+            )
+            to_update = list(Attendance.objects.filter(date=date, user_id__in=changed + missing))
+            for att in to_update:
+                att.entry_time, att.last_seen = spans[att.user_id]
+            Attendance.objects.bulk_update(to_update, ["entry_time", "last_seen"], batch_size=BULK_BATCH)
+        self.stdout.write(self.style.SUCCESS("Tayyor"))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_attendance_exit_sweep_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecognitionEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('camera_id', models.PositiveSmallIntegerField(verbose_name='Kamera')),
+                ('ts', models.DateTimeField(verbose_name='Ko‘rilgan vaqt')),
+                ('date', models.DateField(verbose_name='Sana')),
+                ('distance', models.FloatField(verbose_name='Masofa')),
+                ('track_id', models.PositiveIntegerField(verbose_name='Track')),
+                ('hits', models.PositiveSmallIntegerField(default=1, verbose_name='Kadrlar soni')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recognition_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tanish hodisasi',
+                'verbose_name_plural': 'Tanish hodisalari',
+                'indexes': [models.Index(fields=['date', 'camera_id'], name='attendance__date_0afa29_idx')],
+            },
+        ),
+    ]
@@ -80,11 +80,35 @@ class Attendance(models.Model):
 
     class Meta:
         unique_together = ('user', 'date')
-        indexes = [models.Index(fields=['date', 'is_present'])]
+        # Auto-exit: WHERE date = ? AND is_present AND last_seen < ? — bitta index oralig‘i
+        indexes = [models.Index(fields=['date', 'is_present', 'last_seen'])]
 
     def __str__(self):
         return f"{self.user} — {self.date} ({'Binoda' if self.is_present else 'Chiqdi'})"
 
+class RecognitionEvent(models.Model):
+    """
+    Append-only tanish jurnali: qaysi kamera kimni qachon ko‘rdi. Hech qachon yangilanmaydi.
+    Attendance — shu jurnalning yig‘indisi (entry_time = birinchi, last_seen = oxirgi hodisa).
+    Coalescing yoqilgan bo‘lsa bitta qator = bir foydalanuvchi × kamera × soniya (hits — kadrlar soni).
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='recognition_events')
+    camera_id = models.PositiveSmallIntegerField(verbose_name="Kamera")
+    ts = models.DateTimeField(verbose_name="Ko‘rilgan vaqt")
+    date = models.DateField(verbose_name="Sana")
+    distance = models.FloatField(verbose_name="Masofa")
+    track_id = models.PositiveIntegerField(verbose_name="Track")
+    hits = models.PositiveSmallIntegerField(default=1, verbose_name="Kadrlar soni")
+
+    class Meta:
+        verbose_name = "Tanish hodisasi"
+        verbose_name_plural = "Tanish hodisalari"
+        # Kun bo‘yicha qayta hisoblash va "qaysi kamera qachon" so‘rovlari — bitta index oralig‘i
+        indexes = [models.Index(fields=['date', 'camera_id'])]
+
+    def __str__(self):
+        return f"{self.user_id} — kamera {self.camera_id} ({self.ts:%Y-%m-%d %H:%M:%S})"
+
 class AttendancePhoto(models.Model):
     attendance = models.ForeignKey(Attendance, on_delete=models.CASCADE, related_name='photos')
     image = models.ImageField(upload_to='attendance_photos/%Y/%m/%d/')
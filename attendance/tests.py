@@ -1,3 +1,63 @@
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.db.models import DateTimeField, F, Value
 from django.test import TestCase
+from django.utils import timezone
+
+from attendance.functions import MinutesBetween
+from attendance.models import Attendance
+from camera.tasks import EXIT_TIMEOUT, close_expired_sessions
+from users.models import CustomUser
+
+
+def attendance(user, date, entry_time, last_seen, is_present=True):
+    """last_seen auto_now → ko‘rilgan vaqt update() bilan qo‘yiladi"""
+    att = Attendance.objects.create(user=user, date=date, entry_time=entry_time, is_present=is_present)
+    Attendance.objects.filter(pk=att.pk).update(last_seen=last_seen)
+    return att
+
+
+class MinutesBetweenTests(TestCase):
+    def test_whole_minutes_rounded_down(self):
+        start = timezone.now().replace(microsecond=0)
+        user = CustomUser.objects.create(username="ali")
+        attendance(user, timezone.localdate(start), start, start)
+        end = Value(start + timedelta(minutes=95, seconds=59), output_field=DateTimeField())
+        self.assertEqual(Attendance.objects.annotate(m=MinutesBetween(F("entry_time"), end)).get().m, 95)
+
+    def test_null_entry_time(self):
+        user = CustomUser.objects.create(username="ali")
+        attendance(user, timezone.localdate(), None, timezone.now())
+        end = Value(timezone.now(), output_field=DateTimeField())
+        self.assertIsNone(Attendance.objects.annotate(m=MinutesBetween(F("entry_time"), end)).get().m)
+
+
+class CloseExpiredSessionsTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.today = timezone.localdate(self.now)
+        self.expired = self.now - timedelta(seconds=EXIT_TIMEOUT + 60)
+        self.users = [CustomUser.objects.create(username=f"user{i}") for i in range(4)]
+
+    def test_closes_expired_rows_with_one_update(self):
+        left = attendance(self.users[0], self.today, self.now - timedelta(hours=2), self.expired)
+        no_entry = attendance(self.users[1], self.today, None, self.expired)
+        still_here = attendance(self.users[2], self.today, self.now - timedelta(hours=1), self.now)
+        yesterday = attendance(self.users[3], self.today - timedelta(days=1), self.expired, self.expired)
+
+        with self.assertNumQueries(1):
+            closed = async_to_sync(close_expired_sessions)()
+        self.assertEqual(closed, 2)
 
-# Create your tests here.
+        for att in (left, no_entry, still_here, yesterday):
+            att.refresh_from_db()
+        self.assertFalse(left.is_present)
+        self.assertIsNotNone(left.exit_time)
+        self.assertIn(left.duration_minutes, (119, 120))
+        # entry_time NULL → MinutesBetween NULL → Coalesce(…, 0) → kamida 1 daqiqa
+        self.assertFalse(no_entry.is_present)
+        self.assertEqual(no_entry.duration_minutes, 1)
+        self.assertTrue(still_here.is_present)
+        self.assertIsNone(still_here.exit_time)
+        self.assertTrue(yesterday.is_present)
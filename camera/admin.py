@@ -1,3 +1,17 @@
+# camera/admin.py
 from django.contrib import admin
 
-# Register your models here.
+from .models import CameraSettings
+
+
+@admin.register(CameraSettings)
+class CameraSettingsAdmin(admin.ModelAdmin):
+    list_display = ('device_index', 'name', 'detector', 'quality_threshold', 'target_fps', 'target_detect_fps', 'motion_threshold', 'motion_keepalive', 'updated_at')
+    list_filter = ('detector',)
+    fieldsets = (
+        (None, {'fields': ('device_index', 'name', 'detector')}),
+        ("Tezlik", {'fields': ('target_fps', 'target_detect_fps', 'motion_threshold', 'motion_keepalive')}),
+        ("Aniqlash", {'fields': ('quality_threshold', 'detection_regions')}),
+        ("Galereya bo‘limi", {'fields': ('gallery_departments', 'gallery_groups')}),
+    )
+    ordering = ('device_index',)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CameraConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'camera'
+
+    def ready(self):
+        import camera.signals
@@ -0,0 +1,35 @@
+# camera/broadcast.py — bitta kamera natijasini barcha tomoshabinlarga tarqatish
+
+import asyncio
+
+
+class Broadcaster:
+    """
+    Jarayon ichidagi (in-process) tarqatuvchi.
+    Har bir obunachiga kichik navbat beriladi; sekin klient navbati to‘lsa,
+    eng eski xabar tashlanadi → pipeline hech qachon klientni kutmaydi.
+    """
+    def __init__(self, queue_size=1):
+        self.queue_size = queue_size
+        self._subscribers = set()
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish(self, message):
+        for queue in self._subscribers:
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(message)
@@ -0,0 +1,99 @@
+# camera/capture.py — har bir kamera uchun alohida o‘qish oqimi (thread)
+
+import threading
+import time
+from collections import deque
+
+import cv2
+
+# ============================
+# SOZLAMALAR
+# ============================
+CAPTURE_WIDTH = 1280
+CAPTURE_HEIGHT = 720
+CAPTURE_FPS = 30
+FRAME_BUFFER_SIZE = 3                    # Halqa buferda nechta oxirgi kadr turadi
+READ_ERROR_BACKOFF = 0.5                 # Frame o‘qilmasa shuncha kutib qayta urinadi
+
+
+class FrameRing:
+    """
+    Eng so‘nggi kadrlar uchun kichik halqa bufer.
+    To‘lganda eng eski kadr tashlanadi, har bir kadrga ketma-ket raqam (seq) beriladi.
+    """
+    def __init__(self, size=FRAME_BUFFER_SIZE):
+        self._frames = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._seq = 0
+        self.dropped = 0
+
+    def push(self, frame):
+        with self._lock:
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+            self._seq += 1
+            self._frames.append((self._seq, time.monotonic(), frame))
+            return self._seq
+
+    def latest(self):
+        """(seq, vaqt, frame) — bufer bo‘sh bo‘lsa (0, None, None)"""
+        with self._lock:
+            if not self._frames:
+                return 0, None, None
+            return self._frames[-1]
+
+
+class CameraCapture:
+    """
+    cv2.VideoCapture ni alohida thread ichida o‘qiydi.
+    Event loop hech qachon cap.read() da to‘xtab qolmaydi —
+    iste’molchilar faqat latest() orqali eng yangi kadrni oladi.
+    """
+    def __init__(self, camera_id, buffer_size=FRAME_BUFFER_SIZE):
+        self.camera_id = camera_id
+        self.ring = FrameRing(buffer_size)
+        self.read_errors = 0
+        self._cap = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def open(self):
+        """Bloklovchi chaqiruv — event loopdan asyncio.to_thread orqali chaqiring"""
+        cap = cv2.VideoCapture(self.camera_id)
+        if not cap.isOpened():
+            cap.release()
+            return False
+
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAPTURE_WIDTH)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAPTURE_HEIGHT)
+        cap.set(cv2.CAP_PROP_FPS, CAPTURE_FPS)
+        # Drayver ichida eski kadrlar to‘planib qolmasin
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        self._cap = cap
+        self._thread = threading.Thread(
+            target=self._run, name=f"camera-capture-{self.camera_id}", daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            ret, frame = self._cap.read()   # Kamera FPS tezligida bloklanadi
+            if ret:
+                self.ring.push(frame)
+            else:
+                self.read_errors += 1
+                print(f"[XATO] Kamera {self.camera_id} → frame olishda xato!")
+                self._stop.wait(READ_ERROR_BACKOFF)
+
+    def latest(self):
+        return self.ring.latest()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
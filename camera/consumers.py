@@ -2,11 +2,9 @@
 
 import asyncio
 import json
-import base64
-import cv2
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from camera.tasks import get_camera, release_camera_if_unused, detect_faces
+from camera.tasks import get_camera, release_camera_if_unused
 from attendance.models import Attendance, AttendancePhoto
 from django.utils import timezone
 from collections import defaultdict
@@ -31,7 +29,8 @@ class CameraStreamConsumer(AsyncWebsocketConsumer):
             await self.close(code=4002)
             return
 
-        # Video oqimi boshlanadi
+        # Kamera pipeline natijalariga obuna bo‘lamiz
+        self.queue = self.cam["broadcaster"].subscribe()
         self.stream_task = asyncio.create_task(self.stream_video())
         await self.accept()
         print(f"[VIDEO] Kamera {self.camera_id} ga muvaffaqiyatli ulandi")
@@ -41,36 +40,20 @@ class CameraStreamConsumer(AsyncWebsocketConsumer):
         if hasattr(self, "stream_task") and self.stream_task:
             self.stream_task.cancel()
 
-        if self.cam:
+        if getattr(self, "cam", None):
+            self.cam["broadcaster"].unsubscribe(self.queue)
             self.cam["users"] -= 1
             await release_camera_if_unused(self.camera_id)
 
     async def stream_video(self):
         """
-        Har bir frame → frontendga yuboriladi
-        Yuz ramkalari doimiy → hech qachon yo‘qolmaydi!
+        Kamera pipeline tayyorlagan kadr + yuz ramkalarini frontendga uzatadi.
+        Aniqlash va JPEG kodlash bu yerda qilinmaydi → tomoshabin qo‘shilsa CPU oshmaydi.
         """
         try:
-            async for frame, faces in detect_faces(self.cam):
-                if frame is None:
-                    await asyncio.sleep(0.1)
-                    continue
-
-                # Optimal sifat va hajm
-                success, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 82])
-                if not success:
-                    continue
-
-                frame_b64 = base64.b64encode(buffer).decode()
-
-                await self.send(text_data=json.dumps({
-                    "type": "frame",
-                    "frame": frame_b64,
-                    "detected_faces": faces or []  # Har doim list bo‘lsin
-                }, ensure_ascii=False))
-
-                # ~25-30 FPS
-                await asyncio.sleep(0.035)
+            while True:
+                message = await self.queue.get()
+                await self.send(text_data=message)
 
         except asyncio.CancelledError:
             print(f"[VIDEO] Stream task bekor qilindi (kamera {self.camera_id})")
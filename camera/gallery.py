@@ -0,0 +1,298 @@
+# camera/gallery.py — yuz encodinglari galereyasi (versiyali, delta bilan yangilanadi)
+#
+# Galereya bir marta to‘liq yuklanadi, keyin faqat o‘zgarishlar qo‘llanadi:
+#   • yangi / o‘zgargan FaceEncoding → updated_at watermark (boshqa jarayonlar, masalan Celery ham)
+#   • shu jarayondagi post_save / post_delete signallari → darhol navbatga
+#   • o‘chirilganlar → yozuvlar soni mos kelmasa id lar solishtiriladi
+# Yangilash aniqlash siklidan tashqarida (alohida task + thread) bajariladi,
+# yangi snapshot tayyor bo‘lgach bitta o‘zlashtirish bilan almashtiriladi.
+# Bir nechta ishchi jarayon bo‘lsa DB dan faqat publisher yuklaydi, qolganlar
+# camera.sharedgallery faylini mmap qiladi (matritsa xotirada bitta nusxa).
+
+import asyncio
+import threading
+
+import numpy as np
+from channels.db import database_sync_to_async
+from django.db.models import Q
+
+from camera.identities import EMPTY_IDENTITIES
+from camera.matching import TemplateMatcher
+from camera.sharedgallery import SharedGalleryFile
+from users.models import FaceEncoding
+
+# ============================
+# SOZLAMALAR
+# ============================
+EMBEDDING_DIM = 128
+GALLERY_REFRESH_INTERVAL = 5             # Har 5 soniyada delta tekshiriladi (to‘liq yuklash emas!)
+LOAD_CHUNK_SIZE = 5000                   # values_list oqimi bo‘lak hajmi
+MISSED_FETCH_CHUNK = 900                 # O‘tkazib yuborilgan qatorlar id__in bo‘laklari (SQLite chegarasi)
+ROW_BYTES = EMBEDDING_DIM * 4            # float32
+
+
+class GalleryPartition:
+    """Galereyaning kamera uchun qismi: rows — to‘liq galereyadagi qator indekslari"""
+    __slots__ = ("rows", "matcher")
+
+    def __init__(self, rows, matcher):
+        self.rows = rows
+        self.matcher = matcher
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class GallerySnapshot:
+    """O‘zgarmas galereya holati — aniqlash sikli faqat shuni o‘qiydi"""
+    __slots__ = ("version", "encodings", "row_ids", "user_ids", "identities", "index", "matcher", "_partitions")
+
+    def __init__(self, version, encodings, row_ids, user_ids, identities, matcher=None):
+        self.version = version
+        self.encodings = encodings       # (N, 128) float32, L2 normallangan
+        self.row_ids = row_ids           # [FaceEncoding.id, ...] — qatorlar bilan bir xil tartibda
+        self.user_ids = np.asarray(user_ids, dtype=np.int64)   # (N,) — qatorlar bilan bir xil tartibda
+        self.identities = identities     # IdentityTable — har bir foydalanuvchi uchun bitta yozuv
+        self.index = {row_id: i for i, row_id in enumerate(row_ids)}
+        # Qidiruv indeksi snapshot bilan birga quriladi (yangilovchi threadda, hot path da emas)
+        self.matcher = matcher or TemplateMatcher(encodings, self.user_ids, backend="exact")
+        self._partitions = {}
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    def partition(self, key):
+        """
+        key = (bo‘limlar, guruhlar) — CameraSettings.gallery_partition.
+        Snapshot o‘zgarmas → bo‘lim bir marta quriladi va versiya almashguncha keshlanadi.
+        """
+        part = self._partitions.get(key)
+        if part is None:
+            departments, groups = key
+            owners = [identity.id for identity in self.identities if identity.in_partition(departments, groups)]
+            rows = np.flatnonzero(np.isin(self.user_ids, owners))
+            # Bo‘limlar kichik → har doim aniq qidiruv
+            part = GalleryPartition(rows, TemplateMatcher(self.encodings[rows], self.user_ids[rows], backend="exact"))
+            self._partitions[key] = part
+        return part
+
+    def identity(self, idx):
+        """Galereya qatori → Identity (foydalanuvchi o‘chirilgan bo‘lsa None)"""
+        return self.identities.get(int(self.user_ids[idx]))
+
+
+EMPTY_SNAPSHOT = GallerySnapshot(0, np.empty((0, EMBEDDING_DIM), dtype=np.float32), [], [], EMPTY_IDENTITIES)
+
+
+class FaceGallery:
+    def __init__(self):
+        self.snapshot = EMPTY_SNAPSHOT
+        self.watermark = None            # Oxirgi ko‘rilgan FaceEncoding.updated_at
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self._deleted = set()
+        self._invalid = set()            # Yaroqsiz blobli qatorlar → soni solishtirishda hisobga olinadi
+        self._task = None
+        self.shared = SharedGalleryFile()
+        self._published_version = None
+        self._refreshed = None           # Oxirgi publishdan beri qayta o‘qilgan shaxslar (None → hammasi)
+
+    # ---------- signallar ----------
+    def mark_changed(self, row_id, deleted=False):
+        # Yangilovchi yo‘q jarayonda (Celery, manage.py, faqat HTTP) navbat hech qachon bo‘shatilmaydi
+        if self._task is None or self._task.done():
+            return
+        with self._lock:
+            (self._deleted if deleted else self._dirty).add(row_id)
+
+    def _take_changes(self):
+        with self._lock:
+            dirty, deleted = self._dirty, self._deleted
+            self._dirty, self._deleted = set(), set()
+        return dirty, deleted
+
+    # ---------- yuklash ----------
+    @staticmethod
+    def _fetch(queryset, skip=None):
+        """
+        values_list oqimi → (row_ids, user_ids, matritsa, max updated_at).
+        Bloblar bitta bytes ga qo‘shilib np.frombuffer bilan bir marta o‘qiladi — Python float yo‘q.
+        skip(row_id, updated_at) True qaytarsa qator olinmaydi.
+        """
+        row_ids, user_ids, blobs = [], [], []
+        watermark = None
+        rows = queryset.filter(model_tag=FaceEncoding.MODEL_DLIB_128).values_list(
+            "id", "user_id", "encoding", "updated_at"
+        )
+        for row_id, user_id, blob, updated_at in rows.iterator(chunk_size=LOAD_CHUNK_SIZE):
+            if watermark is None or updated_at > watermark:
+                watermark = updated_at
+            if blob is None or len(blob) != ROW_BYTES or (skip and skip(row_id, updated_at)):
+                continue
+            row_ids.append(row_id)
+            user_ids.append(user_id)
+            blobs.append(blob)
+
+        if blobs:
+            matrix = np.frombuffer(b"".join(blobs), dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+        else:
+            matrix = EMPTY_SNAPSHOT.encodings
+        return row_ids, user_ids, matrix, watermark
+
+    def load_full(self):
+        row_ids, user_ids, matrix, watermark = self._fetch(FaceEncoding.objects.all())
+        identities = self.snapshot.identities.updated(user_ids, refresh=user_ids)
+        matcher = TemplateMatcher(matrix, user_ids, previous=self.snapshot.matcher)
+        version = self.snapshot.version
+        if self.shared.enabled:
+            # Yangi publisher fayldagi versiyadan davom etadi → o‘quvchilar o‘zgarishni sezadi
+            version = max(version, self.shared.read_version() or 0)
+        self.snapshot = GallerySnapshot(version + 1, matrix, row_ids, user_ids, identities, matcher)
+        self.watermark = watermark
+        self.loaded = True
+        self._refreshed = None
+        print(
+            f"[ENCODING] To‘liq yuklandi → {len(row_ids)} ta encoding"
+            f" (v{self.snapshot.version}, {matcher.users} ta foydalanuvchi, matcher: {matcher.backend})"
+        )
+
+    def apply_deltas(self):
+        snap = self.snapshot
+        dirty, deleted = self._take_changes()
+
+        query = Q(id__in=dirty)
+        if self.watermark is not None:
+            query |= Q(updated_at__gte=self.watermark)
+
+        def already_loaded(row_id, updated_at):
+            # Watermark bilan bir xil vaqtli, allaqachon yuklangan qator → qayta qurishga sabab emas
+            return updated_at == self.watermark and row_id in snap.index and row_id not in dirty
+
+        row_ids, user_ids, matrix, watermark = self._fetch(FaceEncoding.objects.filter(query), already_loaded)
+        if watermark is not None and (self.watermark is None or watermark > self.watermark):
+            self.watermark = watermark
+
+        upserts = {row_id: (matrix[i], user_ids[i]) for i, row_id in enumerate(row_ids)}
+        # Yaroqsiz bo‘lib qolgan yoki boshqa modelga o‘tgan qatorlar ham galereyadan chiqadi
+        deleted |= dirty - upserts.keys()
+
+        # Soni mos kelmasa id lar solishtiriladi: boshqa jarayonda o‘chirilganlar va watermarkdan
+        # eski updated_at bilan kech commit qilingan (yoki soati orqada hostdan kelgan) qatorlar
+        current = FaceEncoding.objects.filter(model_tag=FaceEncoding.MODEL_DLIB_128)
+        new_rows = sum(1 for row_id in upserts if row_id not in snap.index)
+        expected = len(snap) + new_rows - len(deleted & snap.index.keys()) + len(self._invalid)
+        if current.count() != expected:
+            current_ids = set(current.values_list("id", flat=True))
+            deleted |= snap.index.keys() - current_ids
+            self._invalid &= current_ids
+            missed = sorted(current_ids - snap.index.keys() - upserts.keys() - self._invalid)
+            for start in range(0, len(missed), MISSED_FETCH_CHUNK):
+                chunk = missed[start:start + MISSED_FETCH_CHUNK]
+                found_ids, found_users, found_matrix, _ = self._fetch(FaceEncoding.objects.filter(id__in=chunk))
+                upserts.update({row_id: (found_matrix[i], found_users[i]) for i, row_id in enumerate(found_ids)})
+                self._invalid.update(set(chunk) - set(found_ids))
+
+        deleted = {row_id for row_id in deleted if row_id in snap.index and row_id not in upserts}
+        if not upserts and not deleted:
+            return
+
+        keep = np.ones(len(snap), dtype=bool)
+        for row_id in deleted:
+            keep[snap.index[row_id]] = False
+
+        encodings = snap.encodings.copy()
+        owners = snap.user_ids.copy()
+        appended_vecs, appended_ids, appended_owners = [], [], []
+        for row_id, (vec, user_id) in upserts.items():
+            if row_id in snap.index:
+                i = snap.index[row_id]
+                encodings[i] = vec
+                owners[i] = user_id
+            else:
+                appended_vecs.append(vec)
+                appended_ids.append(row_id)
+                appended_owners.append(user_id)
+
+        row_ids = [row_id for row_id, k in zip(snap.row_ids, keep) if k] + appended_ids
+        owners = np.concatenate([owners[keep], np.asarray(appended_owners, dtype=np.int64)])
+        encodings = encodings[keep]
+        if appended_vecs:
+            encodings = np.vstack([encodings, np.array(appended_vecs, dtype=np.float32)])
+
+        # O‘zgargan encoding egalari qayta o‘qiladi (ism / rol yangilangan bo‘lishi mumkin)
+        refresh = {int(u) for _, u in upserts.values()}
+        identities = snap.identities.updated(owners.tolist(), refresh=refresh)
+        if self._refreshed is not None:
+            self._refreshed |= refresh
+
+        # Atomik almashtirish — o‘quvchilar eski yoki yangi snapshotni to‘liq ko‘radi
+        matcher = TemplateMatcher(encodings, owners, previous=snap.matcher)
+        self.snapshot = GallerySnapshot(snap.version + 1, encodings, row_ids, owners, identities, matcher)
+        print(
+            f"[ENCODING] Delta: +{len(appended_ids)} ~{len(upserts) - len(appended_ids)} -{len(deleted)}"
+            f" → {len(row_ids)} ta (v{self.snapshot.version})"
+        )
+
+    # ---------- jarayonlararo bo‘lishish ----------
+    def publish_shared(self):
+        snap = self.snapshot
+        if snap.version == self._published_version:
+            return
+        # O‘quvchilar since versiyasida bo‘lsa faqat refreshed shaxslarni qayta o‘qiydi
+        since = self._published_version if self._refreshed is not None and self._published_version else 0
+        self.shared.publish(snap.version, snap.encodings, snap.row_ids, snap.user_ids,
+                            since=since, refreshed=self._refreshed or ())
+        self._published_version = snap.version
+        self._refreshed = set()
+
+    def load_shared(self):
+        """O‘quvchi jarayon: fayl versiyasi o‘zgargan bo‘lsagina qayta map qilinadi"""
+        self._take_changes()             # O‘zgarishlarni publisher DB dan o‘zi ko‘radi
+        version = self.shared.read_version()
+        if version is None or version == self.snapshot.version:
+            return
+        version, encodings, row_ids, user_ids, since, refreshed = self.shared.map()
+        # Ism, rol, face_threshold o‘zgargan foydalanuvchilar ham qayta o‘qiladi. Oraliq versiyalar
+        # o‘tkazib yuborilgan bo‘lsa (yoki publisher to‘liq yuklagan) — barcha shaxslar
+        if since and since == self.snapshot.version:
+            refresh = refreshed.tolist()
+        else:
+            refresh = user_ids.tolist()
+        identities = self.snapshot.identities.updated(user_ids.tolist(), refresh=refresh)
+        matcher = TemplateMatcher(encodings, user_ids, previous=self.snapshot.matcher)
+        self.snapshot = GallerySnapshot(version, encodings, row_ids.tolist(), user_ids, identities, matcher)
+        print(f"[ENCODING] Umumiy galereya map qilindi → {len(encodings)} ta encoding (v{version})")
+
+    def refresh(self):
+        if self.shared.enabled and not self.shared.try_acquire_publisher():
+            self.load_shared()
+            return
+        if not self.loaded:
+            self.load_full()
+        else:
+            self.apply_deltas()
+        if self.shared.enabled:
+            self.publish_shared()
+
+    # ---------- fon yangilovchi ----------
+    async def run_refresher(self):
+        print(f"[ENCODING] Galereya yangilovchi ishga tushdi → har {GALLERY_REFRESH_INTERVAL} sekundda delta")
+        while True:
+            try:
+                # Alohida thread → Django sync thread band bo‘lmaydi
+                await database_sync_to_async(self.refresh, thread_sensitive=False)()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[XATO] Galereyani yangilashda xato: {e}")
+            await asyncio.sleep(GALLERY_REFRESH_INTERVAL)
+
+    def ensure_refresher(self, loop=None):
+        """Event loopda yangilovchi task bitta bo‘lishini ta’minlaydi"""
+        if self._task is None or self._task.done():
+            loop = loop or asyncio.get_running_loop()
+            self._task = loop.create_task(self.run_refresher())
+
+
+GALLERY = FaceGallery()
@@ -0,0 +1,84 @@
+# camera/identities.py — galereya uchun ixcham shaxslar jadvali
+#
+# Aniqlash sikliga to‘liq CustomUser ORM obyektlari kerak emas: overlay uchun ism, rol va
+# tashqi ID yetarli, davomat yozuvchisi esa faqat butun user_id bilan ishlaydi.
+# Shuning uchun galereya qatorlari user_id (int64 massiv) saqlaydi, har bir foydalanuvchi
+# uchun esa bitta __slots__ obyekt — values_list bilan faqat kerakli ustunlar o‘qiladi.
+
+from users.models import CustomUser
+
+IDENTITY_FIELDS = (
+    "id", "username", "full_name", "role", "student_id_number", "employee_id_number",
+    "department_name", "group_name", "face_threshold",
+)
+FETCH_CHUNK_SIZE = 900                   # SQLite parametrlar chegarasidan past
+
+
+class Identity:
+    __slots__ = ("id", "username", "name", "role", "external_id", "department", "group", "threshold")
+
+    def __init__(self, user_id, username, name, role, external_id, department=None, group=None, threshold=None):
+        self.id = user_id
+        self.username = username
+        self.name = name                 # Ekranda ko‘rsatiladigan ism
+        self.role = role                 # Rol yorlig‘i (get_role_display natijasi)
+        self.external_id = external_id   # Talaba / xodim ID raqami
+        self.department = department     # Galereya bo‘limlari uchun (HEMIS)
+        self.group = group
+        self.threshold = threshold       # Shaxsiy masofa chegarasi (None → FACE_THRESHOLD)
+
+    @classmethod
+    def from_row(cls, user_id, username, full_name, role, student_id, employee_id, department, group, threshold):
+        try:
+            role_label = str(CustomUser.Role(role).label)
+        except ValueError:
+            role_label = "Noma'lum"
+        return cls(user_id, username, full_name or username, role_label,
+                   student_id or employee_id or str(user_id), department, group, threshold)
+
+    def in_partition(self, departments, groups):
+        return self.department in departments or self.group in groups
+
+
+class IdentityTable:
+    """{user_id: Identity} — snapshot bilan birga almashtiriladi, o‘zgartirilmaydi"""
+
+    def __init__(self, identities=None):
+        self._by_id = identities or {}
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def get(self, user_id):
+        return self._by_id.get(user_id)
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    @staticmethod
+    def fetch(user_ids):
+        user_ids = sorted(user_ids)
+        identities = {}
+        for start in range(0, len(user_ids), FETCH_CHUNK_SIZE):
+            chunk = user_ids[start:start + FETCH_CHUNK_SIZE]
+            rows = CustomUser.objects.filter(id__in=chunk).values_list(*IDENTITY_FIELDS)
+            identities.update((row[0], Identity.from_row(*row)) for row in rows)
+        return identities
+
+    def updated(self, user_ids, refresh=()):
+        """
+        user_ids — yangi galereyadagi barcha foydalanuvchilar. Jadvalda yo‘qlari va
+        refresh dagilar DB dan o‘qiladi, galereyadan chiqqanlar tashlanadi.
+        """
+        wanted = set(user_ids)
+        to_fetch = (wanted - self._by_id.keys()) | (set(refresh) & wanted)
+        fetched = self.fetch(to_fetch) if to_fetch else {}
+        identities = {}
+        for user_id in wanted:
+            identity = fetched.get(user_id) if user_id in to_fetch else self._by_id.get(user_id)
+            if identity is not None:
+                identities[user_id] = identity
+        return IdentityTable(identities)
+
+
+EMPTY_IDENTITIES = IdentityTable()
@@ -0,0 +1,117 @@
+# camera/management/commands/benchmark_detectors.py
+#
+# Misol:
+#   python manage.py benchmark_detectors media/samples/entrance.mp4 --frames 200
+#   python manage.py benchmark_detectors 0 --backends hog,yunet --reference cnn
+#
+# Har bir backend uchun ms/frame (o‘rtacha va p95) hamda recall chiqaradi.
+# Recall — annotatsiya fayli berilsa unga nisbatan, aks holda --reference backend natijasiga nisbatan.
+
+import json
+import time
+
+import cv2
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from camera.detectors import DETECTORS, get_detector
+from camera.tasks import RESIZE_WIDTH
+from camera.tracking import iou_matrix
+
+
+def recall(truth, found, iou_threshold):
+    if not truth:
+        return 0, 0
+    if not found:
+        return 0, len(truth)
+    ious = iou_matrix(truth, found)
+    hits, used = 0, set()
+    for ti in range(len(truth)):
+        order = np.argsort(ious[ti])[::-1]
+        for fi in order:
+            if ious[ti, fi] < iou_threshold:
+                break
+            if fi not in used:
+                used.add(fi)
+                hits += 1
+                break
+    return hits, len(truth)
+
+
+class Command(BaseCommand):
+    help = "Yuz detektorlari backendlarini namunaviy video ustida solishtiradi (ms/frame va recall)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="Video fayl yo‘li yoki USB kamera indeksi")
+        parser.add_argument("--backends", default=",".join(DETECTORS), help="Vergul bilan: hog,cnn,yunet")
+        parser.add_argument("--reference", default="cnn", help="Annotatsiya bo‘lmasa recall shu backendga nisbatan")
+        parser.add_argument("--annotations", help="JSON: {\"<kadr raqami>\": [[top, right, bottom, left], ...]} (kichik kadr koordinatalari)")
+        parser.add_argument("--frames", type=int, default=100, help="Nechta kadr o‘lchanadi")
+        parser.add_argument("--step", type=int, default=5, help="Har nechta kadrdan bittasi olinadi")
+        parser.add_argument("--width", type=int, default=RESIZE_WIDTH, help="Aniqlash kengligi (piksel)")
+        parser.add_argument("--iou", type=float, default=0.4, help="Topildi deb hisoblash uchun IoU chegarasi")
+
+    def handle(self, *args, **options):
+        frames = self.load_frames(options)
+        if not frames:
+            raise CommandError("Manbadan birorta ham kadr o‘qilmadi")
+
+        backends = [b.strip() for b in options["backends"].split(",") if b.strip()]
+        for name in backends + [options["reference"]]:
+            if name not in DETECTORS:
+                raise CommandError(f"Noma’lum backend: {name}")
+
+        if options["annotations"]:
+            with open(options["annotations"]) as f:
+                raw = json.load(f)
+            truth = [[tuple(box) for box in raw.get(str(i), [])] for i in range(len(frames))]
+            truth_label = "annotatsiya"
+        else:
+            self.stdout.write(f"Recall uchun etalon: {options['reference']} ...")
+            reference = get_detector(options["reference"])
+            truth = [reference.detect(rgb) for rgb in frames]
+            truth_label = options["reference"]
+
+        self.stdout.write(f"{len(frames)} ta kadr, kenglik {options['width']}px, etalon: {truth_label}\n")
+        self.stdout.write(f"{'backend':<10}{'ms/frame':>10}{'p95 ms':>10}{'yuzlar':>9}{'recall':>9}")
+
+        for name in backends:
+            detector = get_detector(name)
+            detector.detect(frames[0])  # Isitish (model yuklash vaqti hisobga olinmaydi)
+
+            timings, found_total, hits, total = [], 0, 0, 0
+            for rgb, expected in zip(frames, truth):
+                started = time.perf_counter()
+                found = detector.detect(rgb)
+                timings.append((time.perf_counter() - started) * 1000)
+                found_total += len(found)
+                h, t = recall(expected, found, options["iou"])
+                hits += h
+                total += t
+
+            recall_text = f"{hits / total:.3f}" if total else "-"
+            self.stdout.write(
+                f"{name:<10}{np.mean(timings):>10.1f}{np.percentile(timings, 95):>10.1f}"
+                f"{found_total:>9}{recall_text:>9}"
+            )
+
+    def load_frames(self, options):
+        source = options["source"]
+        cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+        if not cap.isOpened():
+            raise CommandError(f"Manba ochilmadi: {source}")
+
+        frames, index = [], 0
+        try:
+            while len(frames) < options["frames"]:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if index % options["step"] == 0:
+                    h, w = frame.shape[:2]
+                    small = cv2.resize(frame, (options["width"], int(h * options["width"] / w)))
+                    frames.append(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+                index += 1
+        finally:
+            cap.release()
+        return frames
@@ -0,0 +1,93 @@
+# camera/management/commands/benchmark_matcher.py
+#
+# Misol:
+#   python manage.py benchmark_matcher
+#   python manage.py benchmark_matcher --sizes 1000,10000,100000 --nprobe 4,8,16
+#
+# Sintetik galereya (har bir odam — tasodifiy markaz, so‘rov — shu markaz + shovqin) ustida
+# exact va IVF backendlarini solishtiradi: qurish vaqti, so‘rov kechikishi (p50/p95) va
+# exact natijasiga nisbatan recall@1. "exact/batch" qatori — kadrdagi --batch ta yuz bitta
+# GEMM bilan solishtirilganda bitta yuzga to‘g‘ri keladigan vaqt.
+
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from camera.matching import ExactMatcher, IVFMatcher
+from camera.tasks import FACE_THRESHOLD
+
+
+def unit(rows):
+    return (rows / np.linalg.norm(rows, axis=1, keepdims=True)).astype(np.float32)
+
+
+class Command(BaseCommand):
+    help = "Yuz matcher backendlarini 1k / 10k / 100k galereyada solishtiradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1000,10000,100000", help="Galereya o‘lchamlari (vergul bilan)")
+        parser.add_argument("--queries", type=int, default=500, help="Har o‘lcham uchun so‘rovlar soni")
+        parser.add_argument("--nprobe", default="4,8,16", help="IVF uchun sinaladigan nprobe qiymatlari")
+        parser.add_argument("--noise", type=float, default=0.035, help="So‘rov shovqini (har o‘lcham uchun std)")
+        parser.add_argument("--batch", type=int, default=8, help="Bitta kadrdagi yuzlar soni (batch qidiruv)")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        sizes = [int(x) for x in options["sizes"].split(",")]
+        nprobes = [int(x) for x in options["nprobe"].split(",")]
+
+        self.stdout.write(f"{'N':>8} {'backend':<14}{'qurish s':>10}{'p50 ms':>9}{'p95 ms':>9}{'recall@1':>10}")
+        for n in sizes:
+            gallery = unit(rng.standard_normal((n, 128)))
+            targets = rng.integers(0, n, options["queries"])
+            queries = unit(gallery[targets] + rng.standard_normal((len(targets), 128)) * options["noise"])
+
+            exact = ExactMatcher(gallery)
+            truth, timings = self.run(exact, queries)
+            self.report(n, "exact", 0.0, timings, None)
+
+            found, timings = self.run_batch(exact, queries, options["batch"])
+            same = all(f[0] == t[0] for f, t in zip(found, truth))
+            self.report(n, f"exact/batch{options['batch']}", 0.0, timings, 1.0 if same else 0.0)
+
+            started = time.perf_counter()
+            ivf = IVFMatcher(gallery)
+            build = time.perf_counter() - started
+            for nprobe in nprobes:
+                ivf.nprobe = nprobe
+                found, timings = self.run(ivf, queries)
+                # Faqat chegaradan o‘tgan (ya’ni tanilgan bo‘lishi kerak bo‘lgan) so‘rovlar hisobga olinadi
+                accepted = [i for i, (_, d) in enumerate(truth) if d < FACE_THRESHOLD]
+                hits = sum(1 for i in accepted if found[i][0] == truth[i][0])
+                recall = hits / len(accepted) if accepted else 0.0
+                self.report(n, f"ivf/{nprobe}", build, timings, recall)
+
+    @staticmethod
+    def run(matcher, queries):
+        results, timings = [], []
+        for query in queries:
+            started = time.perf_counter()
+            results.append(matcher.search(query))
+            timings.append((time.perf_counter() - started) * 1000)
+        return results, timings
+
+    @staticmethod
+    def run_batch(matcher, queries, batch):
+        results, timings = [], []
+        for start in range(0, len(queries), batch):
+            chunk = queries[start:start + batch]
+            started = time.perf_counter()
+            indices, distances = matcher.search_batch(chunk)
+            # Bitta yuzga to‘g‘ri keladigan vaqt
+            timings.extend([(time.perf_counter() - started) * 1000 / len(chunk)] * len(chunk))
+            results.extend(zip(indices[:, 0].tolist(), distances[:, 0].tolist()))
+        return results, timings
+
+    def report(self, n, name, build, timings, recall):
+        recall_text = f"{recall:.3f}" if recall is not None else "1.000"
+        self.stdout.write(
+            f"{n:>8} {name:<14}{build:>10.2f}{np.percentile(timings, 50):>9.3f}"
+            f"{np.percentile(timings, 95):>9.3f}{recall_text:>10}"
+        )
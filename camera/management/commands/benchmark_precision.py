@@ -0,0 +1,113 @@
+# camera/management/commands/benchmark_precision.py
+#
+# Misol:
+#   python manage.py benchmark_precision
+#   python manage.py benchmark_precision --precisions float32,bfloat16,int8 --noise 0.035,0.05
+#
+# Ro‘yxatga olingan encodinglar (FaceEncoding, dlib-128) ustida float32 / bfloat16 / int8
+# galereya rejimlarini solishtiradi. So‘rov — ro‘yxatdagi encoding + shovqin (yangi kadr o‘rnida).
+# Qidiruv productiondagi kabi quriladi: TemplateMatcher (markazlar indeksi kvantlangan,
+# rerank_exact=False, backend — FACE_MATCHER). Har rejim uchun: indeks xotirasi (shablonlar
+# float32 da umumiy mmap faylda, ular alohida ko‘rsatiladi), so‘rov vaqti va FACE_THRESHOLD bo‘yicha
+# qaror barcha shablonlar bo‘yicha aniq qidiruv bilan bir xilligi (bir xil qator + bir xil
+# qabul / rad) hamda masofaning eng katta farqi.
+# Oxirida butun galereya (kamida --kernel-rows qator) bo‘yicha skalyar ko‘paytma yadrosi (QuantizedMatrix.dot) o‘lchanadi:
+# kvantlangan rejim float32 dan --tolerance dan ortiq sekin bo‘lsa buyruq xato bilan tugaydi.
+
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from camera.matching import ExactMatcher, QuantizedMatrix, TemplateMatcher
+from camera.tasks import FACE_THRESHOLD
+from users.models import FaceEncoding
+
+
+class Command(BaseCommand):
+    help = "Kvantlangan galereya (bfloat16 / int8) aniqligi va tezligini ro‘yxatdagi encodinglarda tekshiradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--precisions", default="float32,bfloat16,int8")
+        parser.add_argument("--noise", default="0.02,0.035,0.05", help="So‘rov shovqini (har o‘lcham uchun std)")
+        parser.add_argument("--queries", type=int, default=1000, help="Har shovqin darajasi uchun so‘rovlar soni")
+        parser.add_argument("--batch", type=int, default=8, help="Bitta kadrdagi yuzlar soni")
+        parser.add_argument("--kernel-rows", type=int, default=10000,
+                            help="Yadro o‘lchovi uchun galereya shu o‘lchamgacha takrorlanadi")
+        parser.add_argument("--repeat", type=int, default=200, help="Yadro o‘lchovida takrorlar soni")
+        parser.add_argument("--tolerance", type=float, default=0.1,
+                            help="Kvantlangan yadro float32 dan shuncha ulush sekin bo‘lishiga ruxsat")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rows = list(
+            FaceEncoding.objects.filter(model_tag=FaceEncoding.MODEL_DLIB_128).values_list("user_id", "encoding")
+        )
+        owners = np.array([user_id for user_id, _ in rows], dtype=np.int64)
+        gallery = np.array([np.frombuffer(blob, dtype=np.float32) for _, blob in rows])
+        if len(gallery) == 0:
+            raise CommandError("Ro‘yxatga olingan encoding yo‘q")
+
+        rng = np.random.default_rng(options["seed"])
+        precisions = options["precisions"].split(",")
+        matchers = {p: TemplateMatcher(gallery, owners, precision=p) for p in precisions}
+        reference = ExactMatcher(gallery, precision="float32")
+
+        self.stdout.write(
+            f"Galereya: {len(gallery)} ta shablon, {len(np.unique(owners))} ta foydalanuvchi, "
+            f"shablonlar {gallery.nbytes / 2**20:.2f} MB, chegara {FACE_THRESHOLD}"
+        )
+        self.stdout.write(
+            f"{'shovqin':>8} {'aniqlik':<9}{'indeks MB':>10}{'ms/yuz':>9}{'qabul':>8}{'qaror mos':>11}{'max Δd':>10}"
+        )
+        for noise in (float(x) for x in options["noise"].split(",")):
+            targets = rng.integers(0, len(gallery), options["queries"])
+            queries = gallery[targets] + rng.standard_normal((len(targets), gallery.shape[1])) * noise
+            queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+            truth_idx, truth_dist = reference.search_batch(queries)
+            truth_accept = truth_dist[:, 0] < FACE_THRESHOLD
+            for precision, matcher in matchers.items():
+                indices, distances, per_face = self.run(matcher, queries, options["batch"])
+                accept = distances[:, 0] < FACE_THRESHOLD
+                same = (accept == truth_accept) & (~accept | (indices[:, 0] == truth_idx[:, 0]))
+                self.stdout.write(
+                    f"{noise:>8.3f} {precision:<9}{matcher.nbytes / 2**20:>10.2f}{per_face:>9.4f}"
+                    f"{accept.mean():>8.3f}{same.mean():>11.4f}"
+                    f"{np.abs(distances[:, 0] - truth_dist[:, 0]).max():>10.2e}"
+                )
+
+        self.check_kernel(gallery, precisions, options)
+
+    def check_kernel(self, gallery, precisions, options):
+        """Butun galereya bo‘yicha queries @ G.T: kvantlangan yadro float32 dan sekin bo‘lmasligi kerak"""
+        # Kichik galereyada vaqt o‘lchov shovqinidan iborat → qatorlar --kernel-rows gacha takrorlanadi
+        gallery = gallery[np.arange(max(len(gallery), options["kernel_rows"])) % len(gallery)]
+        queries = gallery[:options["batch"]].copy()
+        timings = {}
+        for precision in dict.fromkeys(["float32", *precisions]):
+            codes = QuantizedMatrix(gallery, precision)
+            codes.dot(queries)                       # Isitish (kesh, BLAS threadlari)
+            started = time.perf_counter()
+            for _ in range(options["repeat"]):
+                codes.dot(queries)
+            timings[precision] = (time.perf_counter() - started) * 1000 / options["repeat"]
+
+        self.stdout.write(f"Yadro ({len(gallery)} qator × {len(queries)} yuz): " + ", ".join(
+            f"{precision} {ms:.3f} ms" for precision, ms in timings.items()
+        ))
+        limit = timings["float32"] * (1 + options["tolerance"])
+        slower = [precision for precision, ms in timings.items() if ms > limit]
+        if slower:
+            raise CommandError(f"Kvantlangan yadro float32 dan sekin: {', '.join(slower)}")
+
+    @staticmethod
+    def run(matcher, queries, batch):
+        indices, distances = [], []
+        started = time.perf_counter()
+        for start in range(0, len(queries), batch):
+            i, d = matcher.search_batch(queries[start:start + batch])
+            indices.append(i)
+            distances.append(d)
+        per_face = (time.perf_counter() - started) * 1000 / len(queries)
+        return np.vstack(indices), np.vstack(distances), per_face
@@ -0,0 +1,351 @@
+# camera/matching.py — yuz encodingini galereyadan qidirish (almashtiriladigan backendlar)
+#
+#   • "exact" — butun galereya bo‘yicha aniq qidiruv (kichik galereyalar uchun ideal)
+#   • "ivf"   — sferik k-means bo‘limlari (IVF): so‘rov faqat eng yaqin IVF_NPROBE bo‘limda qidiriladi.
+#               nprobe oshsa → recall oshadi, tezlik pasayadi.
+# Galereya vektorlari va so‘rov L2 normallangan → masofa ||a - b|| = sqrt(2 - 2·cos).
+# Shuning uchun kadrdagi barcha yuzlar bitta E @ G.T (BLAS GEMM) bilan solishtiriladi.
+# FACE_GALLERY_PRECISION = bfloat16 / int8 → qidiruv matritsasi kvantlangan holda saqlanadi,
+# eng yaxshi GALLERY_RERANK_K nomzod esa float32 da qayta baholanadi — masofa va FACE_THRESHOLD
+# bo‘yicha qaror float32 bilan bir xil bo‘ladi. Qayta baholash uchun float32 qatorlar ham
+# saqlanadi, shuning uchun alohida ExactMatcher / IVFMatcher xotirani kamaytirmaydi (nbytes).
+# Bir foydalanuvchida bir nechta shablon bo‘lsa TemplateMatcher avval foydalanuvchi markazlari
+# (centroid) bo‘yicha qidiradi, shablonlar faqat qisqa ro‘yxatdagi foydalanuvchilar uchun ko‘riladi.
+# Markazlar indeksi float32 nusxasiz quriladi (qisqa ro‘yxat shablonlarda float32 da baholanadi) →
+# kvantlash markazlar xotirasini haqiqatan 2x / 4x kamaytiradi; shablonlarning o‘zi esa
+# ishchi jarayonlarda umumiy mmap fayl sahifalaridan o‘qiladi.
+# Kvantlangan skalyar ko‘paytma kichik bloklarda: blok oldindan ajratilgan float32 buferga
+# o‘giriladi (kesh ichida qoladi) va GEMM natijasi tayyor massivga yoziladi — butun galereyaning
+# float32 nusxasi hech qachon yaratilmaydi. 16-bitli rejim bfloat16 (float32 ning yuqori yarmi):
+# numpy da float16 → float32 o‘girish int8 dan ~10x sekin, bfloat16 esa bitta siljitish bilan ochiladi.
+# Modul Django ni import qilmaydi (benchmark va ishchi jarayonlar uchun).
+
+import os
+
+import numpy as np
+
+# ============================
+# SOZLAMALAR
+# ============================
+MATCHER_BACKEND = os.getenv("FACE_MATCHER", "exact")    # "exact" | "ivf"
+IVF_NLIST = int(os.getenv("FACE_MATCHER_NLIST", 0))     # 0 → avtomatik (~ 4·√N)
+IVF_NPROBE = int(os.getenv("FACE_MATCHER_NPROBE", 8))   # Har so‘rovda nechta bo‘lim ko‘riladi
+IVF_MIN_ROWS = 5000                      # Bundan kichik galereyada IVF ma’nosiz → exact
+IVF_TRAIN_SAMPLE = 64                    # k-means uchun har bo‘limga shuncha namuna
+IVF_KMEANS_ITERATIONS = 12
+IVF_RETRAIN_GROWTH = 2.0                 # Galereya shuncha marta o‘sgach markazlar qayta o‘qitiladi
+GALLERY_PRECISION = os.getenv("FACE_GALLERY_PRECISION", "float32")   # "float32" | "bfloat16" | "int8"
+GALLERY_RERANK_K = 8                     # Kvantlangan rejimda float32 da qayta baholanadigan nomzodlar
+QUANT_BLOCK_ROWS = 512                   # Shuncha qator float32 buferga o‘giriladi (128·4·512 = 256 KB, L2 kesh)
+CENTROID_SHORTLIST = 8                   # Markazlar bo‘yicha shuncha foydalanuvchi shablonlari tekshiriladi
+
+PRECISIONS = ("float32", "bfloat16", "int8")
+PRECISION_ALIASES = {"float16": "bfloat16"}    # Eski FACE_GALLERY_PRECISION=float16 sozlamasi ishlayveradi
+
+NO_MATCH = (-1, float("inf"))
+
+
+def cosine_to_distance(sims):
+    """Normallangan vektorlar: ||a - b|| = sqrt(2 - 2·cos)"""
+    return np.sqrt(np.maximum(2.0 - 2.0 * sims, 0.0))
+
+
+def top_k(sims, k):
+    """Har qator uchun eng o‘xshash k ta ustun (o‘xshashlik kamayish tartibida) — argpartition"""
+    k = min(k, sims.shape[1])
+    part = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    part_sims = np.take_along_axis(sims, part, axis=1)
+    order = np.argsort(-part_sims, axis=1)
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_sims, order, axis=1)
+
+
+class QuantizedMatrix:
+    """
+    Galereya matritsasining qidiruv uchun nusxasi:
+      float32  — o‘zgarishsiz;
+      bfloat16 — float32 ning yuqori 16 biti (eng yaqinga yaxlitlangan), uint16 da saqlanadi;
+      int8     — har qator uchun alohida masshtab (max |x| / 127).
+    """
+
+    def __init__(self, matrix, precision=GALLERY_PRECISION):
+        precision = PRECISION_ALIASES.get(precision, precision)
+        if precision not in PRECISIONS:
+            raise ValueError(f"Noma’lum aniqlik: {precision}")
+        self.precision = precision
+        self.scales = None
+        if precision == "float32":
+            self.codes = np.ascontiguousarray(matrix, dtype=np.float32)
+        elif precision == "bfloat16":
+            bits = np.ascontiguousarray(matrix, dtype=np.float32).view(np.uint32)
+            # Round-to-nearest-even: pastki 16 bit tashlanishidan oldin yaxlitlanadi
+            self.codes = ((bits + 0x7FFF + ((bits >> 16) & 1)) >> 16).astype(np.uint16)
+        else:
+            scales = np.abs(matrix).max(axis=1) / 127.0 if len(matrix) else np.empty(0, dtype=np.float32)
+            scales = np.maximum(scales, 1e-12).astype(np.float32)
+            self.codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+            self.scales = scales
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    @property
+    def exact(self):
+        return self.precision == "float32"
+
+    def _decode(self, codes, out):
+        """Kodlar bloki → out (float32, shu o‘lchamdagi bufer), yangi massiv yaratilmaydi"""
+        if self.precision == "bfloat16":
+            np.left_shift(codes, 16, out=out.view(np.uint32), dtype=np.uint32)
+        else:
+            np.copyto(out, codes)
+
+    def dot(self, queries, rows=None):
+        """queries @ matritsa[rows].T — kvantlangan bo‘lsa taxminiy (M, len(rows)) float32"""
+        codes = self.codes if rows is None else self.codes[rows]
+        if self.exact:
+            return queries @ codes.T
+        queries_t = np.ascontiguousarray(queries.T, dtype=np.float32)
+        # (N, M) natija: har blok GEMM i o‘zining ketma-ket qatorlariga yoziladi (out=)
+        sims_t = np.empty((len(codes), len(queries)), dtype=np.float32)
+        buffer = np.empty((min(QUANT_BLOCK_ROWS, len(codes)), codes.shape[1]), dtype=np.float32)
+        for start in range(0, len(codes), QUANT_BLOCK_ROWS):
+            block = codes[start:start + QUANT_BLOCK_ROWS]
+            decoded = buffer[:len(block)]
+            self._decode(block, decoded)
+            np.dot(decoded, queries_t, out=sims_t[start:start + len(block)])
+        if self.scales is not None:
+            sims_t *= (self.scales if rows is None else self.scales[rows])[:, None]
+        return sims_t.T
+
+
+def rerank(queries, candidates, encodings, k):
+    """
+    Kvantlangan qidiruv nomzodlari (M, k') → float32 galereya qatorlari bilan aniq o‘xshashlik.
+    Faqat k' ta qator o‘qiladi (ishchi jarayonlarda — mmap sahifalari).
+    """
+    valid = candidates >= 0
+    vectors = encodings[np.where(valid, candidates, 0)]          # (M, k', D)
+    sims = np.einsum("md,mkd->mk", queries, vectors)
+    sims = np.where(valid, sims, -np.inf)
+    order, best = top_k(sims, k)
+    return np.take_along_axis(candidates, order, axis=1), best
+
+
+class Matcher:
+    name = None
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        """Indeks egallagan xotira: kodlar + qayta baholash uchun saqlangan float32 qatorlar"""
+        raise NotImplementedError
+
+    def search_batch(self, queries, k=1):
+        """
+        queries — (M, 128) normallangan. Natija: (indekslar (M, k), masofalar (M, k)).
+        Nomzod yetmasa indeks -1, masofa inf.
+        """
+        raise NotImplementedError
+
+    def search(self, query, k=1):
+        """Bitta yuz uchun: (qator indeksi, masofa) — galereya bo‘sh bo‘lsa NO_MATCH"""
+        indices, distances = self.search_batch(query[None, :], k)
+        if indices[0, 0] < 0:
+            return NO_MATCH
+        return int(indices[0, 0]), float(distances[0, 0])
+
+    @staticmethod
+    def _empty(m, k):
+        return np.full((m, k), -1, dtype=np.int64), np.full((m, k), np.inf, dtype=np.float32)
+
+
+class ExactMatcher(Matcher):
+    name = "exact"
+
+    def __init__(self, encodings, previous=None, precision=GALLERY_PRECISION, rerank_exact=True):
+        self.size = len(encodings)
+        self.codes = QuantizedMatrix(encodings, precision)
+        # float32 qatorlar faqat qayta baholash uchun kerak (float32 rejimda codes ning o‘zi)
+        self.encodings = encodings if self.codes.exact or rerank_exact else None
+
+    @property
+    def nbytes(self):
+        extra = self.encodings.nbytes if self.encodings is not None and not self.codes.exact else 0
+        return self.codes.nbytes + extra
+
+    def search_batch(self, queries, k=1):
+        if self.size == 0 or len(queries) == 0:
+            return self._empty(len(queries), k)
+        sims = self.codes.dot(queries)                    # (M, N) — bitta GEMM (kvantlangan bo‘lsa bloklab)
+        if self.codes.exact or self.encodings is None:
+            indices, best = top_k(sims, k)
+        else:
+            candidates, _ = top_k(sims, max(k, GALLERY_RERANK_K))
+            indices, best = rerank(queries, candidates, self.encodings, k)
+        result_idx, result_dist = self._empty(len(queries), k)
+        result_idx[:, :indices.shape[1]] = indices
+        result_dist[:, :indices.shape[1]] = cosine_to_distance(best)
+        return result_idx, result_dist
+
+
+def spherical_kmeans(data, k, iterations=IVF_KMEANS_ITERATIONS, seed=0):
+    """Normallangan vektorlar uchun k-means (o‘xshashlik — skalyar ko‘paytma)"""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(data), k * IVF_TRAIN_SAMPLE)
+    sample = data[rng.choice(len(data), sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        # Bo‘sh qolgan bo‘lim → tasodifiy nuqta bilan qayta boshlanadi
+        sums[empty] = sample[rng.choice(sample_size, int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = (sums / np.maximum(norms, 1e-12)).astype(np.float32)
+    return centroids
+
+
+class IVFMatcher(Matcher):
+    name = "ivf"
+
+    def __init__(self, encodings, previous=None, nlist=IVF_NLIST, nprobe=IVF_NPROBE,
+                 precision=GALLERY_PRECISION, rerank_exact=True):
+        self.nprobe = nprobe
+        n = self.size = len(encodings)
+
+        # Oldingi markazlar yaroqli bo‘lsa qayta ishlatiladi → delta yangilanish arzon
+        if (isinstance(previous, IVFMatcher)
+                and n <= previous.trained_rows * IVF_RETRAIN_GROWTH
+                and n >= previous.trained_rows / IVF_RETRAIN_GROWTH):
+            self.centroids = previous.centroids
+            self.trained_rows = previous.trained_rows
+        else:
+            k = nlist or max(1, int(4 * np.sqrt(n)))
+            self.centroids = spherical_kmeans(encodings, min(k, n))
+            self.trained_rows = n
+
+        assign = np.argmax(encodings @ self.centroids.T, axis=1)
+        # Har bir bo‘lim qatorlari ketma-ket joylashadi → qidiruvda bitta slice
+        self.order = np.argsort(assign, kind="stable")
+        self.sorted_codes = QuantizedMatrix(encodings[self.order], precision)
+        counts = np.bincount(assign, minlength=len(self.centroids))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.encodings = encodings if rerank_exact and not self.sorted_codes.exact else None
+
+    @property
+    def nbytes(self):
+        extra = self.encodings.nbytes if self.encodings is not None else 0
+        return self.sorted_codes.nbytes + self.centroids.nbytes + self.order.nbytes + extra
+
+    def search_batch(self, queries, k=1):
+        result_idx, result_dist = self._empty(len(queries), k)
+        if self.size == 0 or len(queries) == 0:
+            return result_idx, result_dist
+
+        # Markazlar bilan o‘xshashlik — barcha so‘rovlar uchun bitta GEMM
+        nprobe = min(self.nprobe, len(self.centroids))
+        centroid_sims = queries @ self.centroids.T
+        probes = np.argpartition(-centroid_sims, nprobe - 1, axis=1)[:, :nprobe]
+
+        for qi, probe in enumerate(probes):
+            rows = np.concatenate([np.arange(self.offsets[c], self.offsets[c + 1]) for c in probe])
+            if len(rows) == 0:
+                continue
+            query = queries[qi:qi + 1]
+            sims = self.sorted_codes.dot(query, rows)
+            if self.sorted_codes.exact or self.encodings is None:
+                indices, best = top_k(sims, k)
+                found_rows = self.order[rows[indices[0]]]
+            else:
+                candidates, _ = top_k(sims, max(k, GALLERY_RERANK_K))
+                found_rows, best = rerank(query, self.order[rows[candidates]], self.encodings, k)
+                found_rows = found_rows[0]
+            found = len(found_rows)
+            result_idx[qi, :found] = found_rows
+            result_dist[qi, :found] = cosine_to_distance(best[0])
+        return result_idx, result_dist
+
+
+MATCHERS = {cls.name: cls for cls in (ExactMatcher, IVFMatcher)}
+
+
+def user_centroids(encodings, owners):
+    """
+    Shablonlarni egasi bo‘yicha guruhlaydi → (tartib, chegaralar, normallangan markazlar).
+    order[offsets[u]:offsets[u + 1]] — u-foydalanuvchi shablonlari qatorlari.
+    """
+    order = np.argsort(owners, kind="stable")
+    _, starts = np.unique(owners[order], return_index=True)
+    offsets = np.append(starts, len(owners))
+    if len(starts) == 0:
+        return order, offsets, np.empty((0, encodings.shape[1]), dtype=np.float32)
+    sums = np.add.reduceat(encodings[order], starts, axis=0)
+    norms = np.linalg.norm(sums, axis=1, keepdims=True)
+    return order, offsets, (sums / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+class TemplateMatcher(Matcher):
+    """
+    Ko‘p shablonli foydalanuvchilar uchun ikki bosqichli qidiruv:
+      1) markazlar bo‘yicha (exact / IVF / kvantlangan — build_matcher) → CENTROID_SHORTLIST foydalanuvchi;
+      2) faqat shu foydalanuvchilar shablonlari float32 da → eng yaqin shablon qatori.
+    Narx shablonlar soniga emas, foydalanuvchilar soniga bog‘liq. Natija indekslari — galereya qatorlari.
+    """
+    name = "templates"
+
+    def __init__(self, encodings, owners, previous=None, backend=None, shortlist=CENTROID_SHORTLIST,
+                 precision=GALLERY_PRECISION):
+        self.encodings = encodings
+        self.size = len(encodings)
+        self.shortlist = shortlist
+        self.order, self.offsets, centroids = user_centroids(encodings, np.asarray(owners))
+        self.users = len(centroids)
+        previous_index = previous.centroid_matcher if isinstance(previous, TemplateMatcher) else None
+        # Markazlarning float32 nusxasi saqlanmaydi — kvantlangan rejimda faqat kodlar qoladi
+        self.centroid_matcher = build_matcher(centroids, previous=previous_index, backend=backend,
+                                              precision=precision, rerank_exact=False)
+
+    @property
+    def backend(self):
+        return self.centroid_matcher.name
+
+    @property
+    def nbytes(self):
+        """Shablonlar (encodings) hisobga olinmaydi — ular snapshot / mmap faylga tegishli"""
+        return self.centroid_matcher.nbytes + self.order.nbytes + self.offsets.nbytes
+
+    def search_batch(self, queries, k=1):
+        result_idx, result_dist = self._empty(len(queries), k)
+        if self.size == 0 or len(queries) == 0:
+            return result_idx, result_dist
+
+        shortlisted, _ = self.centroid_matcher.search_batch(queries, self.shortlist)
+        for qi, users in enumerate(shortlisted):
+            users = users[users >= 0]
+            if len(users) == 0:
+                continue
+            rows = np.concatenate([self.order[self.offsets[u]:self.offsets[u + 1]] for u in users])
+            sims = self.encodings[rows] @ queries[qi]
+            indices, best = top_k(sims[None, :], k)
+            found = indices.shape[1]
+            result_idx[qi, :found] = rows[indices[0]]
+            result_dist[qi, :found] = cosine_to_distance(best[0])
+        return result_idx, result_dist
+
+
+def build_matcher(encodings, previous=None, backend=None, precision=GALLERY_PRECISION, rerank_exact=True):
+    backend = backend or MATCHER_BACKEND
+    if backend not in MATCHERS:
+        raise ValueError(f"Noma’lum matcher: {backend}")
+    if backend == "ivf" and len(encodings) < IVF_MIN_ROWS:
+        backend = "exact"
+    return MATCHERS[backend](encodings, previous=previous, precision=precision, rerank_exact=rerank_exact)
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CameraSettings',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device_index', models.PositiveIntegerField(unique=True, verbose_name='Kamera indeksi')),
+                ('name', models.CharField(blank=True, max_length=100, verbose_name='Kamera nomi')),
+                ('motion_threshold', models.FloatField(default=0.02, help_text='Kichraytirilgan kadrda o‘zgargan piksellar ulushi (0.0 - 1.0). Shundan past → aniqlash o‘tkazib yuboriladi')),
+                ('motion_keepalive', models.FloatField(default=5.0, help_text='Harakat bo‘lmasa ham har necha soniyada bir marta aniqlash ishlaydi')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Kamera sozlamasi',
+                'verbose_name_plural': 'Kamera sozlamalari',
+                'ordering': ['device_index'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('camera', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='camerasettings',
+            name='detection_regions',
+            field=models.JSONField(blank=True, default=list, help_text='Bo‘sh bo‘lsa butun kadr qidiriladi'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('camera', '0002_camerasettings_detection_regions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='camerasettings',
+            name='detector',
+            field=models.CharField(choices=[('hog', 'dlib HOG'), ('cnn', 'dlib CNN'), ('yunet', 'YuNet (ONNX, OpenCV DNN)')], default='hog', max_length=20, verbose_name='Yuz detektori'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('camera', '0003_camerasettings_detector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='camerasettings',
+            name='quality_threshold',
+            field=models.FloatField(default=0.35, help_text='0.0 - 1.0. Sifat bahosi shundan past yuz encoding qilinmaydi va rasmi saqlanmaydi'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('camera', '0004_camerasettings_quality_threshold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='camerasettings',
+            name='target_fps',
+            field=models.FloatField(default=25.0, help_text='Frontendga yuboriladigan kadrlar tezligi (FPS)'),
+        ),
+        migrations.AddField(
+            model_name='camerasettings',
+            name='target_detect_fps',
+            field=models.FloatField(default=10.0, help_text='Yuz aniqlash tezligi (marta / soniya)'),
+        ),
+    ]
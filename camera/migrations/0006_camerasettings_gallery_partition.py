@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('camera', '0005_camerasettings_target_fps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='camerasettings',
+            name='gallery_departments',
+            field=models.JSONField(blank=True, default=list, help_text='CustomUser.department_name qiymatlari, masalan ["Axborot texnologiyalari"]'),
+        ),
+        migrations.AddField(
+            model_name='camerasettings',
+            name='gallery_groups',
+            field=models.JSONField(blank=True, default=list, help_text='CustomUser.group_name qiymatlari, masalan ["AT-21", "AT-22"]'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('camera', '0006_camerasettings_gallery_partition'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='camerasettings',
+            name='quality_threshold',
+            field=models.FloatField(default=0.35, help_text='0.0 - 1.0. Sifat bahosi shundan past yuz encoding qilinmaydi va rasmi saqlanmaydi. Tavsiya: 0.3 - 0.5 (oddiy veb-kamera yuzlari ~0.5 - 0.9 oladi); 0.6 dan yuqorisi haqiqiy tanishlarni ham tashlab yuboradi. 0 → filtr o‘chiq (burilish tekshiruvi ham bajarilmaydi)'),
+        ),
+    ]
@@ -1,3 +1,116 @@
+# camera/models.py
+import os
+
+from django.core.exceptions import ValidationError
 from django.db import models
 
-# Create your models here.
+
+class CameraSettings(models.Model):
+    """
+    Har bir USB kamera (cv2.VideoCapture indeksi) uchun pipeline sozlamalari.
+    Yozuv bo‘lmasa kamera standart qiymatlar bilan ishlaydi.
+    """
+    class Detector(models.TextChoices):
+        # Nomlar camera/detectors.py dagi DETECTORS kalitlari bilan bir xil
+        HOG = "hog", "dlib HOG"
+        CNN = "cnn", "dlib CNN"
+        YUNET = "yunet", "YuNet (ONNX, OpenCV DNN)"
+
+    device_index = models.PositiveIntegerField(unique=True, verbose_name="Kamera indeksi")
+    name = models.CharField(max_length=100, blank=True, verbose_name="Kamera nomi")
+    detector = models.CharField(
+        max_length=20,
+        choices=Detector.choices,
+        default=Detector.HOG,
+        verbose_name="Yuz detektori"
+    )
+
+    # Tezlik maqsadlari (RateController)
+    target_fps = models.FloatField(default=25.0, help_text="Frontendga yuboriladigan kadrlar tezligi (FPS)")
+    target_detect_fps = models.FloatField(default=10.0, help_text="Yuz aniqlash tezligi (marta / soniya)")
+
+    # Harakat filtri (motion gate)
+    motion_threshold = models.FloatField(
+        default=0.02,
+        help_text="Kichraytirilgan kadrda o‘zgargan piksellar ulushi (0.0 - 1.0). Shundan past → aniqlash o‘tkazib yuboriladi"
+    )
+    motion_keepalive = models.FloatField(
+        default=5.0,
+        help_text="Harakat bo‘lmasa ham har necha soniyada bir marta aniqlash ishlaydi"
+    )
+
+    # Yuz sifati chegarasi (xiralik, yorug‘lik, burilish)
+    quality_threshold = models.FloatField(
+        default=0.35,
+        help_text=(
+            "0.0 - 1.0. Sifat bahosi shundan past yuz encoding qilinmaydi va rasmi saqlanmaydi. "
+            "Tavsiya: 0.3 - 0.5 (oddiy veb-kamera yuzlari ~0.5 - 0.9 oladi); 0.6 dan yuqorisi haqiqiy "
+            "tanishlarni ham tashlab yuboradi. 0 → filtr o‘chiq (burilish tekshiruvi ham bajarilmaydi)"
+        )
+    )
+
+    # Aniqlash hududlari (ROI) — [[x1, y1, x2, y2], ...] kadr o‘lchamiga nisbatan 0.0 - 1.0
+    detection_regions = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Bo‘sh bo‘lsa butun kadr qidiriladi"
+    )
+
+    # Galereya bo‘limi — auditoriya kameralari faqat shu bo‘lim / guruhlarni qidiradi,
+    # hech kim chegaradan o‘tmasa butun galereya qidiriladi. Ikkalasi bo‘sh → faqat butun galereya
+    gallery_departments = models.JSONField(
+        default=list,
+        blank=True,
+        help_text='CustomUser.department_name qiymatlari, masalan ["Axborot texnologiyalari"]'
+    )
+    gallery_groups = models.JSONField(
+        default=list,
+        blank=True,
+        help_text='CustomUser.group_name qiymatlari, masalan ["AT-21", "AT-22"]'
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Kamera sozlamasi"
+        verbose_name_plural = "Kamera sozlamalari"
+        ordering = ['device_index']
+
+    def __str__(self):
+        return self.name or f"USB Kamera {self.device_index}"
+
+    @property
+    def gallery_partition(self):
+        """(bo‘limlar, guruhlar) — frozenset juftligi yoki None (bo‘lim sozlanmagan)"""
+        departments = frozenset(d.strip() for d in self.gallery_departments or [] if str(d).strip())
+        groups = frozenset(g.strip() for g in self.gallery_groups or [] if str(g).strip())
+        if not departments and not groups:
+            return None
+        return departments, groups
+
+    def clean(self):
+        super().clean()
+        if self.detector == self.Detector.YUNET:
+            # cv2 / dlib faqat tekshiruv kerak bo‘lganda yuklanadi
+            from camera.detectors import YUNET_MODEL_PATH
+            if not os.path.exists(YUNET_MODEL_PATH):
+                raise ValidationError({"detector": f"YuNet modeli topilmadi: {YUNET_MODEL_PATH}"})
+
+    @staticmethod
+    def clean_regions(raw):
+        """
+        Frontenddan kelgan hududlarni tekshiradi va [[x1, y1, x2, y2], ...] ko‘rinishiga keltiradi.
+        Noto‘g‘ri ma’lumot → ValueError
+        """
+        if not isinstance(raw, list):
+            raise ValueError("Hududlar ro‘yxat bo‘lishi kerak")
+        regions = []
+        for region in raw:
+            if not isinstance(region, (list, tuple)) or len(region) != 4:
+                raise ValueError("Har bir hudud [x1, y1, x2, y2] ko‘rinishida bo‘lishi kerak")
+            x1, y1, x2, y2 = (min(1.0, max(0.0, float(v))) for v in region)
+            if x2 - x1 < 0.01 or y2 - y1 < 0.01:
+                raise ValueError("Hudud juda kichik yoki koordinatalar teskari")
+            regions.append([round(x1, 4), round(y1, 4), round(x2, 4), round(y2, 4)])
+        return regions
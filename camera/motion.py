@@ -0,0 +1,55 @@
+# camera/motion.py — arzon harakat filtri (motion gate)
+#
+# Kadr juda kichik kulrang tasvirga aylantiriladi va sekin yangilanadigan fon bilan solishtiriladi.
+# O‘zgargan piksellar ulushi kamera chegarasidan past bo‘lsa, to‘liq aniqlash (HOG) ishlamaydi.
+
+import cv2
+import numpy as np
+
+# ============================
+# SOZLAMALAR
+# ============================
+MOTION_WIDTH = 64                        # Solishtirish uchun kadr kengligi (piksel)
+MOTION_PIXEL_DELTA = 18                  # Shundan katta farq → piksel o‘zgargan
+MOTION_BACKGROUND_ALPHA = 0.05           # Fon yangilanish tezligi (yorug‘lik asta o‘zgarsa ham ishlaydi)
+
+
+class MotionGate:
+    def __init__(self, threshold, keepalive):
+        self.threshold = threshold
+        self.keepalive = keepalive
+        self.passed = 0
+        self.skipped = 0
+        self.last_score = 0.0
+        self._background = None
+        self._last_pass = None
+
+    def _tiny(self, frame):
+        h, w = frame.shape[:2]
+        tiny = cv2.resize(frame, (MOTION_WIDTH, max(1, int(h * MOTION_WIDTH / w))), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(tiny, cv2.COLOR_BGR2GRAY).astype(np.float32)
+
+    def check(self, frame, now):
+        """True → shu kadrda to‘liq aniqlash ishlashi kerak"""
+        gray = self._tiny(frame)
+        if self._background is None:
+            self._background = gray
+            motion = True
+        else:
+            diff = cv2.absdiff(gray, self._background)
+            self.last_score = float(np.count_nonzero(diff > MOTION_PIXEL_DELTA)) / diff.size
+            cv2.accumulateWeighted(gray, self._background, MOTION_BACKGROUND_ALPHA)
+            motion = self.last_score >= self.threshold
+
+        if motion or self._last_pass is None or now - self._last_pass >= self.keepalive:
+            self._last_pass = now
+            self.passed += 1
+            return True
+
+        self.skipped += 1
+        return False
+
+    @property
+    def skip_ratio(self):
+        total = self.passed + self.skipped
+        return self.skipped / total if total else 0.0
@@ -0,0 +1,193 @@
+# camera/photos.py — davomat rasmlarini saqlash (alohida bosqich)
+#
+# Tanish sikli rasmni faqat navbatga qo‘yadi (bloklamaydi). JPEG kodlash, disk va DB yozuvi
+# PHOTO_WORKERS ta o‘z threadlarida bajariladi — standart executor va davomat buferi band bo‘lmaydi.
+# Navbat to‘lsa yangi rasm tashlanadi (dropped hisoblagichi) — sekin disk tanishni sekinlashtirmaydi.
+#
+# Best-shot: har foydalanuvchi uchun PHOTO_INTERVAL oynasi davomida eng yaxshi bo‘lak
+# (aniqlik, yuz o‘lchami, moslik ishonchi) xotirada saqlanadi, oyna yopilganda faqat g‘olib
+# navbatga tushadi. Yutqazgan bo‘laklar kodlanmaydi ham, yozilmaydi ham.
+# Ishchilararo cheklov (PRESENCE.claim_photo) oyna ochilgan vaqt bilan olinadi: ketma-ket oynalar
+# orasi kamida PHOTO_INTERVAL → har oynada bitta rasm, g‘olib kadr vaqti qayerda bo‘lishidan qat’i nazar.
+
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from channels.db import database_sync_to_async
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from attendance.models import Attendance, AttendancePhoto
+from camera.gallery import GALLERY
+from camera.presence import PRESENCE
+from camera.recorder import AttendanceBuffer
+
+# ============================
+# SOZLAMALAR
+# ============================
+PHOTO_JPEG_QUALITY = 90                  # Saqlanadigan rasm sifati
+PHOTO_MAX_SIZE = 320                     # Uzun tomoni shundan katta bo‘lsa kichraytiriladi (piksel)
+PHOTO_QUEUE_SIZE = 64                    # Navbatdagi rasmlar chegarasi
+PHOTO_WORKERS = 2                        # Rasm yozuvchi threadlar soni
+BEST_SHOT_WEIGHTS = (0.5, 0.25, 0.25)    # (aniqlik, o‘lcham, ishonch) — bo‘lak bahosi
+BEST_SHOT_FULL_SIZE = 160                # Yuz balandligi shundan katta → o‘lcham bahosi 1.0 (piksel)
+WINDOW_CHECK_INTERVAL = 1.0              # Yopilgan oynalar shuncha soniyada bir tekshiriladi
+
+
+def shot_score(sharpness, face_height, confidence):
+    """0..1 — oynadagi eng yaxshi bo‘lakni tanlash uchun"""
+    w_sharp, w_size, w_conf = BEST_SHOT_WEIGHTS
+    size = min(1.0, face_height / BEST_SHOT_FULL_SIZE)
+    return w_sharp * sharpness + w_size * size + w_conf * max(0.0, confidence)
+
+
+class ShotWindow:
+    __slots__ = ("opened", "started", "score", "crop", "seen_at", "offers")
+
+    def __init__(self, opened, started):
+        self.opened = opened             # time.monotonic()
+        self.started = started           # Unix vaqt — rasm navbatini olish (claim_photo) uchun
+        self.score = -1.0
+        self.crop = None
+        self.seen_at = None
+        self.offers = 0
+
+
+class PhotoWriter:
+    def __init__(self, interval, queue_size=PHOTO_QUEUE_SIZE, workers=PHOTO_WORKERS,
+                 quality=PHOTO_JPEG_QUALITY, max_size=PHOTO_MAX_SIZE):
+        self.interval = interval         # Bir foydalanuvchi uchun rasmlar orasidagi minimal vaqt
+        self.queue_size = queue_size
+        self.workers = workers
+        self.quality = quality
+        self.max_size = max_size
+        self._queue = None
+        self._pool = None
+        self._tasks = []
+        self._windows = {}               # {user_id: ShotWindow}
+        self.stats = {
+            "offered": 0, "submitted": 0, "written": 0, "dropped": 0, "throttled": 0, "errors": 0,
+        }
+        self.last_write_ms = 0.0
+
+    # ---------- event loop tomoni ----------
+    def offer(self, user_id, face_crop, score, seen_at, now=None):
+        """Oynadagi nomzod. Faqat hozirgi eng yaxshisidan yuqori bo‘lsa nusxa olinadi"""
+        now = now if now is not None else time.monotonic()
+        window = self._windows.get(user_id)
+        if window is None:
+            window = self._windows[user_id] = ShotWindow(now, seen_at.timestamp())
+        window.offers += 1
+        self.stats["offered"] += 1
+        if score > window.score:
+            window.score = score
+            window.crop = np.ascontiguousarray(face_crop).copy()
+            window.seen_at = seen_at
+
+    def close_windows(self, now=None, force=False):
+        """Muddati tugagan oynalar g‘olibini navbatga qo‘yadi"""
+        now = now if now is not None else time.monotonic()
+        closed = [user_id for user_id, w in self._windows.items() if force or now - w.opened >= self.interval]
+        for user_id in closed:
+            window = self._windows.pop(user_id)
+            self.submit(user_id, window.crop, window.seen_at, window.started)
+        return len(closed)
+
+    async def _window_closer(self):
+        while True:
+            await asyncio.sleep(WINDOW_CHECK_INTERVAL)
+            self.close_windows()
+
+    def submit(self, user_id, face_crop, seen_at, slot=None):
+        """
+        Bloklamaydi. face_crop — kadrdan ajratilgan nusxa (butun kadrni ushlab turmaydi).
+        slot — claim_photo vaqti (oyna ochilgan payt, standart seen_at). Navbat to‘la bo‘lsa rasm tashlanadi va False qaytadi
+        """
+        if self._queue is None:
+            self.stats["dropped"] += 1
+            return False
+        slot = slot if slot is not None else seen_at.timestamp()
+        try:
+            self._queue.put_nowait((user_id, face_crop, seen_at, slot))
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            return False
+        self.stats["submitted"] += 1
+        return True
+
+    async def _worker(self):
+        write = database_sync_to_async(self.write, thread_sensitive=False, executor=self._pool)
+        while True:
+            user_id, face_crop, seen_at, slot = await self._queue.get()
+            try:
+                # Boshqa ishchi shu oraliqda oyna ochib rasm saqlagan bo‘lsa — o‘tkazib yuboriladi
+                if not await PRESENCE.claim_photo(user_id, slot, self.interval):
+                    self.stats["throttled"] += 1
+                    continue
+                started = time.monotonic()
+                await write(user_id, face_crop, seen_at)
+                self.last_write_ms = (time.monotonic() - started) * 1000
+                self.stats["written"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[XATO] Rasm saqlashda xato: {e}")
+            finally:
+                self._queue.task_done()
+
+    def ensure_workers(self, loop=None):
+        """Navbat va ishchilar bir marta yaratiladi (event loop ichida)"""
+        if self._tasks and not all(task.done() for task in self._tasks):
+            return
+        loop = loop or asyncio.get_running_loop()
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="photo")
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(loop.create_task(self._window_closer()))
+        print(f"[RASMI] Rasm yozuvchi ishga tushdi → {self.workers} ishchi, navbat {self.queue_size}")
+
+    # ---------- ishchi thread tomoni ----------
+    def encode(self, face_crop):
+        h, w = face_crop.shape[:2]
+        longest = max(h, w)
+        if longest > self.max_size:
+            scale = self.max_size / longest
+            face_crop = cv2.resize(face_crop, (max(1, int(w * scale)), max(1, int(h * scale))),
+                                   interpolation=cv2.INTER_AREA)
+        ok, buffer = cv2.imencode('.jpg', face_crop, [int(cv2.IMWRITE_JPEG_QUALITY), self.quality])
+        if not ok:
+            raise ValueError("JPEG kodlab bo‘lmadi")
+        return buffer.tobytes()
+
+    def write(self, user_id, face_crop, seen_at):
+        data = self.encode(face_crop)
+        date = timezone.localdate(seen_at)
+        att = Attendance.objects.filter(user_id=user_id, date=date).only("id").first()
+        if att is None:
+            # Davomat buferi hali flush qilinmagan → qator bufer yo‘li bilan yaratiladi (conflict,
+            # entry_time / last_seen birlashtirish va auto_now tuzatishi bitta joyda)
+            with transaction.atomic():
+                AttendanceBuffer.upsert(date, {user_id: (seen_at, seen_at)})
+            att = Attendance.objects.only("id").get(user_id=user_id, date=date)
+        identity = GALLERY.snapshot.identities.get(user_id)
+        photo = AttendancePhoto(attendance=att)
+        filename = f"{identity.username if identity else user_id}_{uuid.uuid4().hex[:8]}.jpg"
+        photo.image.save(filename, ContentFile(data))
+        print(f"[RASMI] {identity.name if identity else f'#{user_id}'} uchun rasm saqlandi → {filename}")
+
+    # ---------- metrikalar ----------
+    def snapshot(self):
+        return {
+            **self.stats,
+            "open_windows": len(self._windows),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+            "write_ms": round(self.last_write_ms, 1),
+        }
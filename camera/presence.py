@@ -0,0 +1,180 @@
+# camera/presence.py — kim qachon ko‘rilgani (last-seen) va oxirgi rasm vaqti
+#
+# Ikki backend (PRESENCE_BACKEND):
+#   • "memory" — jarayon ichidagi dict (bitta Daphne ishchi, standart)
+#   • "redis"  — sorted set: a’zo = user_id, ball = unix vaqt. Barcha ishchilar bitta holatni
+#                ko‘radi, restartdan keyin ham saqlanadi. Muddati o‘tganlar ZRANGEBYSCORE bilan
+#                O(log n + m) da topiladi.
+# Hot path (touch) tarmoqqa chiqmaydi: Redis backend o‘zgarishlarni yig‘ib,
+# har PRESENCE_SYNC_INTERVAL soniyada bitta pipeline bilan yozadi.
+
+import asyncio
+import os
+import time
+
+# ============================
+# SOZLAMALAR
+# ============================
+PRESENCE_BACKEND = os.getenv("PRESENCE_BACKEND", "memory")            # "memory" | "redis"
+PRESENCE_REDIS_URL = os.getenv("PRESENCE_REDIS_URL", "redis://127.0.0.1:6379/3")
+PRESENCE_KEY_PREFIX = "camera:presence"
+PRESENCE_SYNC_INTERVAL = 1.0             # Redis ga yig‘ilgan last-seen shuncha soniyada bir yoziladi
+
+# Muddati o‘tganlarni oladi va o‘chiradi — oraliqda boshqa ishchi yangilagan a’zo tegilmaydi
+POP_EXPIRED_SCRIPT = """
+local members = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', '(' .. ARGV[1])
+if #members > 0 then
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', '(' .. ARGV[1])
+end
+return members
+"""
+
+# Oxirgi rasmdan interval o‘tgan bo‘lsa yangi vaqtni yozib 1 qaytaradi — atomik (bir nechta ishchi)
+CLAIM_PHOTO_SCRIPT = """
+local last = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if last and tonumber(ARGV[2]) - tonumber(last) < tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+return 1
+"""
+
+
+class PresenceStore:
+    """Interfeys. Vaqtlar — unix soniya (float)"""
+    name = None
+    needs_sync = False
+
+    def __init__(self):
+        self._task = None
+
+    def touch(self, user_id, ts):
+        """Bloklamaydi. Shu jarayonda yangi ko‘rinish bo‘lsa True"""
+        raise NotImplementedError
+
+    async def flush(self):
+        """Yig‘ilgan o‘zgarishlarni saqlash (memory backend uchun hech narsa qilmaydi)"""
+
+    async def pop_expired(self, before):
+        """last-seen < before bo‘lgan user_id larni qaytaradi va ro‘yxatdan o‘chiradi (atomik)"""
+        raise NotImplementedError
+
+    async def claim_photo(self, user_id, ts, interval):
+        """Rasm saqlash navbati shu chaqiruvga berilsa True (oxirgi rasmdan interval o‘tgan)"""
+        raise NotImplementedError
+
+    async def run_sync(self):
+        print(f"[PRESENCE] {self.name} backend → har {PRESENCE_SYNC_INTERVAL} sekundda sinxronlash")
+        try:
+            while True:
+                await asyncio.sleep(PRESENCE_SYNC_INTERVAL)
+                try:
+                    await self.flush()
+                except Exception as e:
+                    print(f"[XATO] Presence sinxronlashda xato: {e}")
+        finally:
+            await asyncio.shield(self.flush())
+
+    def ensure_sync(self, loop=None):
+        """Event loopda sinxronlash task bitta bo‘lishini ta’minlaydi (faqat kerak bo‘lsa)"""
+        if self.needs_sync and (self._task is None or self._task.done()):
+            loop = loop or asyncio.get_running_loop()
+            self._task = loop.create_task(self.run_sync())
+
+
+class MemoryPresenceStore(PresenceStore):
+    name = "memory"
+
+    def __init__(self):
+        super().__init__()
+        self.last_seen = {}              # {user_id: ts}
+        self.last_photo = {}             # {user_id: ts}
+        self.photo_interval = 0.0        # Oxirgi claim_photo intervali — eski rasm vaqtlarini tozalash uchun
+
+    def touch(self, user_id, ts):
+        is_new = user_id not in self.last_seen
+        if is_new or ts > self.last_seen[user_id]:
+            self.last_seen[user_id] = ts
+        return is_new
+
+    async def pop_expired(self, before):
+        expired = [user_id for user_id, ts in self.last_seen.items() if ts < before]
+        for user_id in expired:
+            del self.last_seen[user_id]
+        # Intervaldan eski rasm vaqti claim_photo ga ta’sir qilmaydi → lug‘at o‘smaydi (Redis dagi kabi)
+        cutoff = time.time() - self.photo_interval
+        for user_id in [user_id for user_id, ts in self.last_photo.items() if ts < cutoff]:
+            del self.last_photo[user_id]
+        return expired
+
+    async def claim_photo(self, user_id, ts, interval):
+        self.photo_interval = interval
+        last = self.last_photo.get(user_id)
+        if last is not None and ts - last < interval:
+            return False
+        self.last_photo[user_id] = ts
+        return True
+
+
+class RedisPresenceStore(PresenceStore):
+    name = "redis"
+    needs_sync = True
+
+    def __init__(self, url=PRESENCE_REDIS_URL, prefix=PRESENCE_KEY_PREFIX):
+        import redis.asyncio as redis    # django-redis bilan birga o‘rnatiladi
+
+        super().__init__()
+        self.client = redis.from_url(url)
+        self.seen_key = f"{prefix}:last_seen"
+        self.photo_key = f"{prefix}:last_photo"
+        self._pending = {}               # Flush qilinmagan {user_id: ts}
+        self._known = set()              # Shu jarayon ko‘rgan, hali chiqmagan foydalanuvchilar
+        self._pop_expired = self.client.register_script(POP_EXPIRED_SCRIPT)
+        self._claim_photo = self.client.register_script(CLAIM_PHOTO_SCRIPT)
+
+    def touch(self, user_id, ts):
+        if ts > self._pending.get(user_id, 0.0):
+            self._pending[user_id] = ts
+        is_new = user_id not in self._known
+        self._known.add(user_id)
+        return is_new
+
+    async def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        try:
+            # GT → boshqa ishchi yozgan yangiroq vaqt ustiga eskisi yozilmaydi
+            await self.client.zadd(self.seen_key, batch, gt=True)
+        except Exception:
+            for user_id, ts in batch.items():
+                if ts > self._pending.get(user_id, 0.0):
+                    self._pending[user_id] = ts
+            raise
+
+    async def pop_expired(self, before):
+        await self.flush()               # Shu jarayonning eng so‘nggi ko‘rinishlari hisobga olinadi
+        members = await self._pop_expired(keys=[self.seen_key], args=[before])
+        expired = [int(member) for member in members]
+        self._known.difference_update(expired)
+        return expired
+
+    async def claim_photo(self, user_id, ts, interval):
+        claimed = await self._claim_photo(keys=[self.photo_key], args=[user_id, ts, interval])
+        if claimed:
+            # Eski rasm vaqtlari kerak emas → to‘plam o‘smaydi
+            await self.client.zremrangebyscore(self.photo_key, "-inf", f"({ts - interval}")
+        return bool(claimed)
+
+
+PRESENCE_BACKENDS = {cls.name: cls for cls in (MemoryPresenceStore, RedisPresenceStore)}
+
+
+def create_presence_store(backend=None):
+    backend = backend or PRESENCE_BACKEND
+    if backend not in PRESENCE_BACKENDS:
+        raise ValueError(f"Noma’lum presence backend: {backend}")
+    return PRESENCE_BACKENDS[backend]()
+
+
+PRESENCE = create_presence_store()
@@ -0,0 +1,88 @@
+# camera/ratecontrol.py — kamera pipeline uchun moslashuvchan FPS boshqaruvi
+#
+# Belgilangan sleep o‘rniga muddat (deadline) asosida ishlaydi: keyingi kadr vaqti
+# oldingi muddatdan hisoblanadi, ishlov berish vaqti ustiga qo‘shilmaydi.
+# Har bir bosqich (aniqlash, preview) kechikishi EMA bilan o‘lchanadi va
+# kamera maqsadidan sekinroq bo‘lsa tezlik avtomatik pasaytiriladi.
+
+import time
+from collections import deque
+
+# ============================
+# SOZLAMALAR
+# ============================
+MAX_FRAME_AGE = 0.5                      # Shundan eski kadr qayta ishlanmaydi (soniya)
+LATENCY_EMA_ALPHA = 0.2                  # Kechikish o‘rtachasi uchun silliqlash koeffitsienti
+LATENCY_HEADROOM = 1.2                   # Bosqich kechikishidan shuncha barobar sekinroq → navbat to‘planmaydi
+FPS_WINDOW = 2.0                         # Samarali FPS shu oynada hisoblanadi (soniya)
+IDLE_POLL_INTERVAL = 0.005               # Yangi kadr yo‘q bo‘lsa qancha kutiladi
+
+
+class RateController:
+    def __init__(self, target_fps, target_detect_fps):
+        self.target_fps = target_fps
+        self.target_detect_fps = target_detect_fps
+        self.latency = {}                # {bosqich: EMA soniya}
+        self._next_frame = None
+        self._next_detect = 0.0
+        self._published = deque()
+        self._detected = deque()
+
+    # ---------- o‘lchov ----------
+    def observe(self, stage, seconds):
+        previous = self.latency.get(stage)
+        self.latency[stage] = seconds if previous is None else previous + LATENCY_EMA_ALPHA * (seconds - previous)
+
+    def _interval(self, target, stage):
+        interval = 1.0 / max(target, 0.1)
+        return max(interval, self.latency.get(stage, 0.0) * LATENCY_HEADROOM)
+
+    @property
+    def frame_interval(self):
+        return self._interval(self.target_fps, "preview")
+
+    @property
+    def detect_interval(self):
+        return self._interval(self.target_detect_fps, "detect")
+
+    # ---------- rejalashtirish ----------
+    def wait_time(self, now):
+        """Keyingi kadrgacha qancha uxlash kerak — muddat siljib ketmaydi"""
+        interval = self.frame_interval
+        if self._next_frame is None or now - self._next_frame > interval:
+            self._next_frame = now            # Ortda qolsak — yetib olishga urinmaymiz, kadr tashlanadi
+        self._next_frame += interval
+        return max(0.0, self._next_frame - now)
+
+    def should_detect(self, now):
+        return now >= self._next_detect
+
+    def detect_started(self, now):
+        self._next_detect = now + self.detect_interval
+        self._detected.append(now)
+
+    def frame_published(self, now):
+        self._published.append(now)
+
+    # ---------- metrikalar ----------
+    @staticmethod
+    def _rate(events, now):
+        while events and now - events[0] > FPS_WINDOW:
+            events.popleft()
+        return len(events) / FPS_WINDOW
+
+    def effective_fps(self, now=None):
+        return self._rate(self._published, now or time.monotonic())
+
+    def effective_detect_fps(self, now=None):
+        return self._rate(self._detected, now or time.monotonic())
+
+    def snapshot(self):
+        now = time.monotonic()
+        return {
+            "fps": round(self.effective_fps(now), 1),
+            "detect_fps": round(self.effective_detect_fps(now), 1),
+            "target_fps": self.target_fps,
+            "target_detect_fps": self.target_detect_fps,
+            "latency_ms": {stage: round(value * 1000, 1) for stage, value in self.latency.items()},
+        }
@@ -0,0 +1,277 @@
+# camera/recorder.py — tanish jurnali va davomatni yozishda write-behind bufer
+#
+# Har bir tanilgan yuz uchun DB ga murojaat qilinmaydi: bufer tanish hodisalarini yig‘adi va
+# har ATTENDANCE_FLUSH_INTERVAL soniyada bitta tranzaksiyada yozadi:
+#   1) RecognitionEvent — append-only jurnal (bulk_create, hech qachon yangilanmaydi)
+#   2) Attendance — shu partiyadan hosil qilingan yig‘indi (birinchi / oxirgi ko‘rinish)
+# Coalescing (EVENT_COALESCE_SECONDS > 0): bir foydalanuvchi × kamera × oraliq uchun bitta qator,
+# kadrlar hits da sanaladi → 30 fps da ham qatorlar soni odamlar soniga bog‘liq, kadrlarga emas.
+# Bufer chegaralangan: EVENT_MAX_PENDING dan ortiq hodisa kelsa yangisi tashlanadi (dropped)
+# va flush darhol uyg‘otiladi.
+
+import asyncio
+import os
+import time
+
+from channels.db import database_sync_to_async
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from attendance.models import Attendance, RecognitionEvent
+from users.models import CustomUser
+
+# ============================
+# SOZLAMALAR
+# ============================
+ATTENDANCE_FLUSH_INTERVAL = 1.0          # Bufer shuncha soniyada bir marta DB ga yoziladi
+ATTENDANCE_BULK_BATCH = 500              # bulk_create / bulk_update batch_size
+EVENT_COALESCE_SECONDS = float(os.getenv("RECOGNITION_EVENT_COALESCE", 1))   # 0 → har kadr alohida qator
+EVENT_MAX_PENDING = 20000                # Bir flushgacha saqlanadigan hodisalar soni
+ATTENDANCE_MAX_RETRIES = 5               # Yozilmagan hodisa shuncha flushdan keyin tashlanadi
+
+ATTENDANCE_FIELDS = ("id", "user_id", "entry_time", "exit_time", "last_seen", "is_present")
+MERGED_FIELDS = ["entry_time", "last_seen", "is_present", "exit_time"]
+
+
+class AttendanceBuffer:
+    def __init__(self, interval=ATTENDANCE_FLUSH_INTERVAL, max_pending=EVENT_MAX_PENDING,
+                 coalesce=EVENT_COALESCE_SECONDS):
+        self.interval = interval
+        self.max_pending = max_pending
+        self.coalesce = coalesce
+        # {kalit: [user_id, camera_id, seen_at, distance, track_id, hits, urinishlar]}
+        # kalit — (user_id, camera_id, oraliq) yoki coalescing o‘chiq bo‘lsa tartib raqami
+        self._events = {}
+        self._seq = 0
+        self._oldest = None              # Flush qilinmagan eng eski yozuv (time.monotonic)
+        self._wakeup = None
+        self._task = None
+        self.stats = {
+            "recorded": 0, "coalesced": 0, "dropped": 0, "flushes": 0,
+            "events": 0, "created": 0, "updated": 0, "errors": 0, "orphaned": 0, "expired": 0,
+        }
+        self.last_flush_lag = 0.0        # Eng eski yozuv kelganidan DB ga tushguncha (soniya)
+        self.max_flush_lag = 0.0
+        self.last_flush_duration = 0.0
+
+    # ---------- event loop tomoni ----------
+    def record(self, user_id, seen_at, camera_id, distance, track_id):
+        """Bloklamaydi, DB ga murojaat qilmaydi — hodisa buferga qo‘shiladi yoki oraliqqa qo‘shiladi"""
+        if self.coalesce > 0:
+            key = (user_id, camera_id, int(seen_at.timestamp() // self.coalesce))
+            event = self._events.get(key)
+            if event is not None:
+                # Oraliqdagi birinchi vaqt qoladi, masofa — eng ishonchli kadrniki
+                event[5] += 1
+                if distance < event[3]:
+                    event[3], event[4] = distance, track_id
+                self.stats["recorded"] += 1
+                self.stats["coalesced"] += 1
+                return
+        else:
+            key = self._seq
+            self._seq += 1
+        if len(self._events) >= self.max_pending:
+            self.stats["dropped"] += 1
+            if self._wakeup is not None:
+                self._wakeup.set()
+            return
+        self._events[key] = [user_id, camera_id, seen_at, distance, track_id, 1, 0]
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+        self.stats["recorded"] += 1
+
+    def _take(self):
+        batch, oldest = self._events, self._oldest
+        self._events, self._oldest = {}, None
+        return batch, oldest
+
+    def _restore(self, batch, oldest):
+        """
+        Yozilmagan partiya buferga qaytariladi (shu orada kelgan hodisalar bilan birlashtiriladi).
+        ATTENDANCE_MAX_RETRIES marta yozilmagan hodisa tashlanadi (expired) — bitta buzuq
+        qator butun buferni cheksiz ushlab turmaydi.
+        """
+        for key, event in batch.items():
+            event[6] += 1
+            if event[6] >= ATTENDANCE_MAX_RETRIES:
+                self.stats["expired"] += 1
+                continue
+            current = self._events.get(key)
+            if current is None:
+                if len(self._events) >= self.max_pending:
+                    # Bufer chegarasi qayta yuborishda ham saqlanadi (DB uzoq ishlamasa xotira o‘smaydi)
+                    self.stats["dropped"] += 1
+                    continue
+                self._events[key] = event
+                continue
+            current[5] += event[5]
+            current[6] = max(current[6], event[6])
+            if event[2] < current[2]:
+                current[2] = event[2]
+            if event[3] < current[3]:
+                current[3], current[4] = event[3], event[4]
+        self._oldest = min(self._oldest, oldest) if self._oldest is not None else oldest
+
+    # ---------- DB tomoni ----------
+    @classmethod
+    def write(cls, events):
+        """
+        → (hodisalar, yaratilgan, yangilangan, tashlangan). Buferdagi foydalanuvchi o‘chirilgan bo‘lsa
+        (galereya 5 s gacha orqada) FK xatosi har flushda takrorlanardi → mavjud bo‘lmagan
+        user_id lar tashlanadi va qolganlari qayta yoziladi.
+        """
+        try:
+            return cls._write(events) + (0,)
+        except IntegrityError:
+            user_ids = {event[0] for event in events}
+            existing = set(CustomUser.objects.filter(id__in=user_ids).values_list("id", flat=True))
+            kept = [event for event in events if event[0] in existing]
+            if len(kept) == len(events):
+                raise
+            return cls._write(kept) + (len(events) - len(kept),)
+
+    @staticmethod
+    def _merge(att, first, last):
+        """
+        Mavjud qatorga partiyaning birinchi / oxirgi ko‘rinishi qo‘shiladi. Qayta yuborilgan eski partiya
+        last_seen ni orqaga surmaydi va auto-exit dan oldingi ko‘rinish qatorni qayta ochmaydi.
+        """
+        att.entry_time = min(att.entry_time, first) if att.entry_time else first
+        att.last_seen = max(att.last_seen, last) if att.last_seen else last
+        if att.exit_time is None or last > att.exit_time:
+            att.is_present = True
+            att.exit_time = None
+
+    @classmethod
+    def upsert(cls, date, seen):
+        """
+        {user_id: (birinchi, oxirgi)} → (yaratilgan, yangilangan). Attendance qatorlari yaratiladigan
+        yagona yo‘l: bufer flushi va rasm yozuvchi (bufer hali flush qilinmagan bo‘lsa) shu yerdan o‘tadi.
+        Tranzaksiya ichida chaqiriladi.
+        """
+        seen = dict(seen)
+        existing = Attendance.objects.filter(date=date, user_id__in=list(seen)).only(*ATTENDANCE_FIELDS)
+        to_update = []
+        for att in existing:
+            cls._merge(att, *seen.pop(att.user_id))
+            to_update.append(att)
+        # bulk_update auto_now ni chetlab o‘tadi → last_seen aniq ko‘rilgan vaqt bo‘ladi
+        Attendance.objects.bulk_update(to_update, MERGED_FIELDS, batch_size=ATTENDANCE_BULK_BATCH)
+        created, updated = 0, len(to_update)
+        if not seen:
+            return created, updated
+        # Qolganlar — bugungi birinchi ko‘rinish (parallel yaratilgan bo‘lsa conflict e’tiborsiz)
+        Attendance.objects.bulk_create(
+            [
+                Attendance(user_id=user_id, date=date, entry_time=first, last_seen=last, is_present=True)
+                for user_id, (first, last) in seen.items()
+            ],
+            batch_size=ATTENDANCE_BULK_BATCH,
+            ignore_conflicts=True,
+        )
+        fresh = list(Attendance.objects.filter(date=date, user_id__in=list(seen)).only(*ATTENDANCE_FIELDS))
+        for att in fresh:
+            first, last = seen[att.user_id]
+            if att.entry_time == first:
+                # Shu chaqiruv yaratgan qator: bulk_create auto_now ni qo‘llagan (last_seen = hozir)
+                # → ko‘rilgan vaqt qayta yoziladi
+                att.last_seen = last
+                created += 1
+            else:
+                # Conflict — qatorni boshqa jarayon yaratgan, mavjud qator kabi birlashtiriladi
+                cls._merge(att, first, last)
+                updated += 1
+        Attendance.objects.bulk_update(fresh, MERGED_FIELDS, batch_size=ATTENDANCE_BULK_BATCH)
+        return created, updated
+
+    @classmethod
+    def _write(cls, events):
+        """[[user_id, camera_id, seen_at, distance, track_id, hits, urinishlar]] → (hodisalar, yaratilgan, yangilangan)"""
+        rows = []
+        summary = {}                     # {date: {user_id: [birinchi, oxirgi]}}
+        for user_id, camera_id, seen_at, distance, track_id, hits, _ in events:
+            date = timezone.localdate(seen_at)
+            rows.append(RecognitionEvent(
+                user_id=user_id, camera_id=camera_id, ts=seen_at, date=date,
+                distance=distance, track_id=track_id, hits=min(hits, 32767),
+            ))
+            span = summary.setdefault(date, {}).get(user_id)
+            if span is None:
+                summary[date][user_id] = [seen_at, seen_at]
+            elif seen_at < span[0]:
+                span[0] = seen_at
+            elif seen_at > span[1]:
+                span[1] = seen_at
+
+        created = updated = 0
+        # Jurnal va yig‘indi birga yoziladi → xatoda partiya qaytariladi, qatorlar ikki marta tushmaydi
+        with transaction.atomic():
+            RecognitionEvent.objects.bulk_create(rows, batch_size=ATTENDANCE_BULK_BATCH)
+            for date, seen in summary.items():
+                date_created, date_updated = cls.upsert(date, seen)
+                created += date_created
+                updated += date_updated
+        return len(rows), created, updated
+
+    async def flush(self):
+        batch, oldest = self._take()
+        if not batch:
+            return
+        started = time.monotonic()
+        try:
+            events, created, updated, orphaned = await database_sync_to_async(self.write, thread_sensitive=False)(
+                list(batch.values())
+            )
+        except Exception as e:
+            self.stats["errors"] += 1
+            self._restore(batch, oldest)
+            print(f"[XATO] Davomat buferini yozishda xato: {e}")
+            return
+        finished = time.monotonic()
+        self.stats["flushes"] += 1
+        self.stats["events"] += events
+        self.stats["created"] += created
+        self.stats["updated"] += updated
+        self.stats["orphaned"] += orphaned
+        self.last_flush_duration = finished - started
+        self.last_flush_lag = finished - oldest
+        self.max_flush_lag = max(self.max_flush_lag, self.last_flush_lag)
+
+    async def run_flusher(self):
+        mode = f"coalescing {self.coalesce} s" if self.coalesce > 0 else "har kadr"
+        print(f"[DAVOMAT] Write-behind bufer ishga tushdi → har {self.interval} sekundda flush, jurnal: {mode}")
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                await self.flush()
+        finally:
+            # To‘xtatilganda (server yopilishi) qolgan yozuvlar yo‘qolmaydi
+            await asyncio.shield(self.flush())
+
+    def ensure_flusher(self, loop=None):
+        """Event loopda flush task bitta bo‘lishini ta’minlaydi"""
+        if self._task is None or self._task.done():
+            loop = loop or asyncio.get_running_loop()
+            self._task = loop.create_task(self.run_flusher())
+
+    # ---------- metrikalar ----------
+    def snapshot(self):
+        pending_age = time.monotonic() - self._oldest if self._oldest is not None else 0.0
+        return {
+            **self.stats,
+            "pending": len(self._events),
+            "coalesce_s": self.coalesce,
+            "pending_age_ms": round(pending_age * 1000, 1),
+            "flush_lag_ms": round(self.last_flush_lag * 1000, 1),
+            "max_flush_lag_ms": round(self.max_flush_lag * 1000, 1),
+            "flush_ms": round(self.last_flush_duration * 1000, 1),
+        }
+
+
+ATTENDANCE_BUFFER = AttendanceBuffer()
@@ -0,0 +1,115 @@
+# camera/sharedgallery.py — galereyani jarayonlar orasida bo‘lishish (memory-mapped fayl)
+#
+# Bitta jarayon (publisher — lock faylni birinchi olgan) galereyani DB dan yuklaydi va faylga yozadi,
+# qolgan ASGI / vision ishchilar faylni faqat o‘qish uchun mmap qiladi → matritsa xotirada bitta nusxa.
+#
+# Fayl tuzilishi (little-endian):
+#   sarlavha  HEADER_SIZE bayt: magic, versiya (u64), qatorlar soni (u64), o‘lcham (u32),
+#             since (u64), refresh soni (u64)
+#   float32   [count, dim]   — L2 normallangan encodinglar
+#   int64     [count]        — FaceEncoding.id
+#   int64     [count]        — CustomUser.id
+#   int64     [refresh]      — since versiyasidan beri ma’lumoti (ism, rol, chegara) o‘zgargan
+#                              foydalanuvchilar. since = 0 → barcha shaxslar qayta o‘qilsin
+# Yozish: vaqtinchalik fayl → os.replace. Eski mmap eski inode ni ko‘rishda davom etadi,
+# o‘quvchi sarlavhadagi versiya o‘zgarganini ko‘rgach qayta map qiladi.
+# Modul Django ni import qilmaydi.
+
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:                      # Windows — bo‘lishish o‘chadi, har jarayon o‘z galereyasi bilan
+    fcntl = None
+
+# ============================
+# SOZLAMALAR
+# ============================
+SHARED_GALLERY_PATH = os.getenv(
+    "FACE_GALLERY_PATH", os.path.join(tempfile.gettempdir(), "camera_face_gallery.bin")
+)                                        # "" → bo‘lishish o‘chiriladi
+MAGIC = b"CAMGAL02"
+HEADER = struct.Struct("<8sQQIQQ")
+HEADER_SIZE = 64                         # Ma’lumotlar 64 baytga tekislangan holda boshlanadi
+
+
+class SharedGalleryFile:
+    def __init__(self, path=SHARED_GALLERY_PATH):
+        self.path = path
+        self._lock_fd = None
+
+    @property
+    def enabled(self):
+        return bool(self.path) and fcntl is not None
+
+    # ---------- publisher ----------
+    def try_acquire_publisher(self):
+        """Lock bo‘sh bo‘lsa shu jarayon publisher bo‘ladi (lock jarayon yopilguncha saqlanadi)"""
+        if self._lock_fd is not None:
+            return True
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    @property
+    def is_publisher(self):
+        return self._lock_fd is not None
+
+    def publish(self, version, encodings, row_ids, user_ids, since=0, refreshed=()):
+        count, dim = encodings.shape
+        refreshed = np.asarray(sorted(refreshed), dtype=np.int64)
+        directory = os.path.dirname(self.path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".gallery-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(HEADER.pack(MAGIC, version, count, dim, since, len(refreshed)).ljust(HEADER_SIZE, b"\0"))
+                f.write(np.ascontiguousarray(encodings, dtype=np.float32).tobytes())
+                f.write(np.asarray(row_ids, dtype=np.int64).tobytes())
+                f.write(np.asarray(user_ids, dtype=np.int64).tobytes())
+                f.write(refreshed.tobytes())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.path)   # Atomik — o‘quvchi yarim yozilgan faylni ko‘rmaydi
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    # ---------- o‘quvchi ----------
+    def read_version(self):
+        """Faqat sarlavha o‘qiladi — fayl yo‘q yoki buzilgan bo‘lsa None"""
+        try:
+            with open(self.path, "rb") as f:
+                header = f.read(HEADER.size)
+        except FileNotFoundError:
+            return None
+        if len(header) < HEADER.size:
+            return None
+        magic, version = HEADER.unpack(header)[:2]
+        return version if magic == MAGIC else None
+
+    def map(self):
+        """(versiya, encodings, row_ids, user_ids, since, refreshed) — massivlar mmap ustidagi read-only ko‘rinishlar"""
+        with open(self.path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, dim, since, refresh_count = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Galereya fayli buzilgan: {self.path}")
+        offset = HEADER_SIZE
+        encodings = np.frombuffer(mapped, dtype=np.float32, count=count * dim, offset=offset).reshape(count, dim)
+        offset += encodings.nbytes
+        row_ids = np.frombuffer(mapped, dtype=np.int64, count=count, offset=offset)
+        offset += row_ids.nbytes
+        user_ids = np.frombuffer(mapped, dtype=np.int64, count=count, offset=offset)
+        offset += user_ids.nbytes
+        refreshed = np.frombuffer(mapped, dtype=np.int64, count=refresh_count, offset=offset)
+        return version, encodings, row_ids, user_ids, since, refreshed
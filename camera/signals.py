@@ -0,0 +1,18 @@
+import sys
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from camera.models import CameraSettings
+
+
+@receiver(post_save, sender=CameraSettings)
+def camera_settings_saved(sender, instance, **kwargs):
+    """
+    Admin yoki ROI sahifasida saqlangan sozlama ochiq kamera pipeline iga darhol qo‘llanadi.
+    camera.tasks yuklanmagan jarayonda (Celery, HTTP) kamera ham yo‘q → hech narsa qilinmaydi.
+    Boshqa jarayonlardagi pipeline lar o‘zgarishni camera.tasks.watch_camera_settings orqali oladi.
+    """
+    tasks = sys.modules.get("camera.tasks")
+    if tasks is not None:
+        tasks.apply_camera_settings(instance.device_index, instance)
@@ -3,113 +3,169 @@
 import asyncio
 import cv2
 import numpy as np
-import face_recognition
 import base64
-import uuid
-from concurrent.futures import ThreadPoolExecutor
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from datetime import timedelta
 from django.utils import timezone
-from django.core.files.base import ContentFile
-from users.models import FaceEncoding, CustomUser
-from attendance.models import Attendance, AttendancePhoto
+from django.db.models import DateTimeField, F, Value
+from django.db.models.functions import Coalesce, Greatest
+from attendance.functions import MinutesBetween
+from attendance.models import Attendance
+from camera.broadcast import Broadcaster
+from camera.capture import CameraCapture
+from camera.gallery import GALLERY
+from camera.models import CameraSettings
+from camera.photos import PhotoWriter, shot_score
+from camera.presence import PRESENCE
+from camera.recorder import ATTENDANCE_BUFFER
+from camera.motion import MotionGate
+from camera.ratecontrol import IDLE_POLL_INTERVAL, MAX_FRAME_AGE, RateController
+from camera.tracking import FaceTracker
+from camera.vision import encode_face_crops, locate_faces, locate_faces_in_regions
 
 # ============================
 # SOZLAMALAR — ENG YAXSHI NATIJA UCHUN
 # ============================
-FRAME_INTERVAL = 0.03                    # ~33 FPS teorik
-DETECTION_INTERVAL = 1         # Har frameda qidiramiz → ramka yo‘qolmaydi
 RESIZE_WIDTH = 500             # Biroz kattaroq → aniqlik oshadi
 FACE_THRESHOLD = 0.60          # ← ENG MUHIM O‘ZGARTIRISH! (0.58 ~ 0.62 oralig‘i ideal)
+MIN_CONFIDENCE = 0.55          # 1 - masofa shundan past → ishonchsiz
 MIN_FACE_SIZE = 70             # Kichik yuzlarni rad etamiz → xato kamayadi
 EXIT_TIMEOUT = 180                       # 3 daqiqa ko‘rinmasa → chiqdi deb hisoblaydi
 PHOTO_INTERVAL = 20                      # Har 20 soniyada 1 ta rasm saqlaydi
-ENCODING_REFRESH_INTERVAL = 60           # Har 1 daqiqada encoding yangilanadi
-
-executor = ThreadPoolExecutor(max_workers=6)
+PREVIEW_JPEG_QUALITY = 82                # Frontendga yuboriladigan kadr sifati
+DETECTION_EXECUTOR = os.getenv("DETECTION_EXECUTOR", "process")       # "process" | "thread"
+DETECTION_WORKERS = int(os.getenv("DETECTION_WORKERS", os.cpu_count() or 2))
+MAX_INFLIGHT_PER_CAMERA = 1              # Kamera uchun bir vaqtda nechta kadr aniqlanadi
+ENCODE_FROM_FULL_RES = True              # Encoding kichik kadrdan emas, 1280x720 kadr bo‘lagidan
+ENCODE_CROP_MARGIN = 0.25                # Landmark uchun yuz atrofidan qo‘shimcha joy (yuz o‘lchamiga nisbatan)
+ENCODE_CROP_MAX_SIZE = 400               # Bo‘lak shundan katta bo‘lsa kichraytiriladi (dlib baribir 150x150 ga keltiradi)
+SETTINGS_POLL_INTERVAL = 5               # Boshqa jarayonda saqlangan kamera sozlamalari shuncha soniyada tekshiriladi
+
+DETECTION_POOL = None
 CAMERA_INSTANCES = {}
-KNOWN_ENCODINGS = {"data": None, "users": None, "last_update": None}
-ACTIVE_SESSIONS = {}                     # {user_id: last_seen_time}
-last_photo_cache = {}                    # {user_id: last_photo_time}
+CAMERA_OPEN_LOCK = asyncio.Lock()
+SETTINGS_WATCHER = None
+PHOTO_WRITER = PhotoWriter(PHOTO_INTERVAL)
 
 # ============================
 # KAMERA BOSHQARUVI
 # ============================
 async def get_camera(camera_id=0):
-    if camera_id in CAMERA_INSTANCES:
-        CAMERA_INSTANCES[camera_id]["users"] += 1
-        print(f"[KAMERA] {camera_id} → qayta ishlatildi (users: {CAMERA_INSTANCES[camera_id]['users']})")
+    async with CAMERA_OPEN_LOCK:
+        if camera_id in CAMERA_INSTANCES:
+            CAMERA_INSTANCES[camera_id]["users"] += 1
+            print(f"[KAMERA] {camera_id} → qayta ishlatildi (users: {CAMERA_INSTANCES[camera_id]['users']})")
+            return CAMERA_INSTANCES[camera_id]
+
+        print(f"[KAMERA] Yangi kamera ochilmoqda: {camera_id}")
+        GALLERY.ensure_refresher()
+        ATTENDANCE_BUFFER.ensure_flusher()
+        PRESENCE.ensure_sync()
+        PHOTO_WRITER.ensure_workers()
+        ensure_settings_watcher()
+        capture = CameraCapture(camera_id)
+        # VideoCapture ochilishi sekin → event loopni band qilmaymiz
+        if not await asyncio.to_thread(capture.open):
+            print(f"[XATO] Kamera {camera_id} ochilmadi! USB yoki ruxsatlar tekshiring!")
+            return None
+
+        settings = await load_camera_settings(camera_id)
+        CAMERA_INSTANCES[camera_id] = {
+            "capture": capture,
+            "settings": settings,
+            "motion": MotionGate(settings.motion_threshold, settings.motion_keepalive),
+            "rate": RateController(settings.target_fps, settings.target_detect_fps),
+            "broadcaster": Broadcaster(),
+            "users": 1,
+            "pipeline": None,
+            "tracker": FaceTracker(),
+            "stats": {"frames": 0, "detections": 0, "detect_skipped": 0, "encodings": 0, "low_quality": 0, "stale_dropped": 0, "partition_fallbacks": 0},
+        }
+        # Aniqlash pipeline kameraga tegishli → tomoshabinlar soniga bog‘liq emas
+        CAMERA_INSTANCES[camera_id]["pipeline"] = asyncio.create_task(
+            run_camera_pipeline(CAMERA_INSTANCES[camera_id])
+        )
+        print(f"[MUVOFFAQIYAT] Kamera {camera_id} muvaffaqiyatli ochildi!")
         return CAMERA_INSTANCES[camera_id]
 
-    print(f"[KAMERA] Yangi kamera ochilmoqda: {camera_id}")
-    cap = cv2.VideoCapture(camera_id)
-    if not cap.isOpened():
-        print(f"[XATO] Kamera {camera_id} ochilmadi! USB yoki ruxsatlar tekshiring!")
-        return None
-
-    # Optimal sozlamalar
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-    cap.set(cv2.CAP_PROP_FPS, 30)
-
-    lock = asyncio.Lock()
-    CAMERA_INSTANCES[camera_id] = {
-        "cap": cap,
-        "frame": None,
-        "lock": lock,
-        "users": 1,
-        "task": None
-    }
-
-    async def update_frames():
-        while True:
-            ret, frame = cap.read()
-            if ret:
-                async with lock:
-                    CAMERA_INSTANCES[camera_id]["frame"] = frame.copy()
-            else:
-                print(f"[XATO] Kamera {camera_id} → frame olishda xato!")
-            await asyncio.sleep(FRAME_INTERVAL)
-
-    CAMERA_INSTANCES[camera_id]["task"] = asyncio.create_task(update_frames())
-    print(f"[MUVOFFAQIYAT] Kamera {camera_id} muvaffaqiyatli ochildi!")
-    return CAMERA_INSTANCES[camera_id]
+@sync_to_async
+def load_camera_settings(camera_id):
+    """Bazada yozuv bo‘lmasa — standart qiymatli (saqlanmagan) obyekt"""
+    return CameraSettings.objects.filter(device_index=camera_id).first() or CameraSettings(device_index=camera_id)
+
+def camera_stats():
+    """Ochiq kameralar bo‘yicha metrikalar (camera/stats/ uchun)"""
+    result = {}
+    for camera_id, cam in list(CAMERA_INSTANCES.items()):
+        result[camera_id] = {
+            **cam["stats"],
+            "viewers": cam["broadcaster"].subscriber_count,
+            "motion_skipped": cam["motion"].skipped,
+            "motion_skip_ratio": round(cam["motion"].skip_ratio, 3),
+            "motion_score": round(cam["motion"].last_score, 4),
+            **cam["rate"].snapshot(),
+        }
+    return result
+
+def apply_camera_settings(camera_id, settings):
+    """Sozlama saqlanganda ochiq kamera pipeline darhol yangisidan foydalanadi"""
+    cam = CAMERA_INSTANCES.get(camera_id)
+    if cam:
+        cam["settings"] = settings
+        cam["motion"].threshold = settings.motion_threshold
+        cam["motion"].keepalive = settings.motion_keepalive
+        cam["rate"].target_fps = settings.target_fps
+        cam["rate"].target_detect_fps = settings.target_detect_fps
+
+@database_sync_to_async
+def load_changed_settings(known):
+    """{camera_id: updated_at} → shu jarayon bilmagan (boshqa jarayonda saqlangan) sozlamalar"""
+    if not known:
+        return []
+    rows = CameraSettings.objects.filter(device_index__in=list(known))
+    return [settings for settings in rows if settings.updated_at != known[settings.device_index]]
+
+async def watch_camera_settings():
+    """
+    Admin boshqa jarayonda (HTTP ishchi) saqlasa post_save signali bu yerga yetmaydi →
+    ochiq kameralar sozlamasi updated_at bo‘yicha kuzatiladi va o‘zgarsa darhol qo‘llanadi.
+    """
+    while True:
+        await asyncio.sleep(SETTINGS_POLL_INTERVAL)
+        try:
+            known = {camera_id: cam["settings"].updated_at for camera_id, cam in list(CAMERA_INSTANCES.items())}
+            for settings in await load_changed_settings(known):
+                apply_camera_settings(settings.device_index, settings)
+                print(f"[KAMERA] {settings.device_index} → yangi sozlamalar qo‘llandi")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[XATO] Kamera sozlamalarini tekshirishda xato: {e}")
+
+def ensure_settings_watcher(loop=None):
+    """Event loopda kuzatuvchi task bitta bo‘lishini ta’minlaydi"""
+    global SETTINGS_WATCHER
+    if SETTINGS_WATCHER is None or SETTINGS_WATCHER.done():
+        loop = loop or asyncio.get_running_loop()
+        SETTINGS_WATCHER = loop.create_task(watch_camera_settings())
 
 async def release_camera_if_unused(camera_id):
     cam = CAMERA_INSTANCES.get(camera_id)
     if cam and cam["users"] <= 0:
         print(f"[KAMERA] {camera_id} bo‘sh → yopilmoqda...")
-        if cam["task"]:
-            cam["task"].cancel()
-        cam["cap"].release()
         del CAMERA_INSTANCES[camera_id]
+        if cam["pipeline"]:
+            cam["pipeline"].cancel()
+        # Thread join + release bloklaydi → alohida threadda
+        await asyncio.to_thread(cam["capture"].stop)
         print(f"[KAMERA] {camera_id} yopildi.")
 
-# ============================
-# ENCODING YUKLASH
-# ============================
-@sync_to_async
-def get_latest_encodings():
-    global KNOWN_ENCODINGS
-    now = timezone.now()
-    if (KNOWN_ENCODINGS["last_update"] is None or
-        (now - KNOWN_ENCODINGS["last_update"]).total_seconds() > ENCODING_REFRESH_INTERVAL):
-
-        encodings = []
-        users = []
-        for fe in FaceEncoding.objects.select_related("user").all():
-            vec = np.array(fe.encoding_data, dtype=np.float32)
-            if vec.shape == (128,):
-                norm_vec = vec / np.linalg.norm(vec)
-                encodings.append(norm_vec)
-                users.append(fe.user)
-
-        KNOWN_ENCODINGS["data"] = np.array(encodings) if encodings else np.empty((0, 128))
-        KNOWN_ENCODINGS["users"] = users
-        KNOWN_ENCODINGS["last_update"] = now
-        print(f"[ENCODING] Yangilandi → {len(encodings)} ta odam yuklandi")
-
-    return KNOWN_ENCODINGS["data"], KNOWN_ENCODINGS["users"]
-
 # ============================
 # CHIQISH ANIQLASH (AUTO EXIT)
 # ============================
@@ -117,129 +173,385 @@ async def auto_exit_detector():
     print("[AUTO EXIT] Ishga tushdi → har 30 sekundda tekshiradi")
     while True:
         await asyncio.sleep(30)
-        now = timezone.now()
-        expired = [uid for uid, t in list(ACTIVE_SESSIONS.items()) if (now - t).total_seconds() > EXIT_TIMEOUT]
-        for uid in expired:
-            user = await sync_to_async(CustomUser.objects.get)(id=uid)
-            await mark_exit(user)
-            ACTIVE_SESSIONS.pop(uid, None)
+        try:
+            closed = await close_expired_sessions()
+        except Exception as e:
+            print(f"[XATO] Auto exit: {e}")
+            continue
+        if closed:
+            print(f"[CHIQISH] {closed} ta foydalanuvchi chiqdi deb belgilandi")
+        # Presence store dagi eskirgan yozuvlar ham tozalanadi (qaror DB bo‘yicha qabul qilingan)
+        await PRESENCE.pop_expired(time.time() - EXIT_TIMEOUT)
 
 @sync_to_async
-def mark_exit(user):
-    today = timezone.localdate()
-    att = Attendance.objects.filter(user=user, date=today, is_present=True).first()
-    if att:
-        att.exit_time = timezone.now()
-        att.is_present = False
-        duration = (att.exit_time - att.entry_time).total_seconds() // 60
-        att.duration_minutes = max(1, int(duration))
-        att.save()
-        print(f"[CHIQISH] {user.full_name} chiqdi → {att.exit_time.strftime('%H:%M')}")
+def close_expired_sessions():
+    """
+    EXIT_TIMEOUT dan beri ko‘rinmaganlar — bitta UPDATE bilan (date, is_present, last_seen) index orqali.
+    exit_time va duration_minutes SQL ichida hisoblanadi; nechta yozuv yopilgani qaytariladi.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=EXIT_TIMEOUT)
+    # Bufer hali yozmagan ko‘rinishlar hisobga olinmasa ham xato bo‘lmaydi: kechikish ≤ flush oralig‘i
+    now_value = Value(now, output_field=DateTimeField())
+    return Attendance.objects.filter(
+        date=timezone.localdate(now), is_present=True, last_seen__lt=cutoff
+    ).update(
+        exit_time=now_value,
+        is_present=False,
+        duration_minutes=Greatest(Coalesce(MinutesBetween(F('entry_time'), now_value), 0), 1),
+    )
 
 # ============================
 # TANISH + RASM SAQLASH
 # ============================
-@sync_to_async
-def process_recognition(user, face_crop):
-    today = timezone.localdate()
+def process_recognition(user_id, camera_id, distance, track_id, face_crop=None, photo_score=0.0):
+    """
+    Event loopda, bloklamasdan: tanish hodisasi write-behind buferga yoziladi (DB ga emas),
+    bo‘lak esa PHOTO_INTERVAL oynasidagi best-shot tanloviga nomzod bo‘ladi.
+    """
     now = timezone.now()
+    ATTENDANCE_BUFFER.record(user_id, now, camera_id, distance, track_id)
+    if PRESENCE.touch(user_id, now.timestamp()):
+        identity = GALLERY.snapshot.identities.get(user_id)
+        print(f"[TANISH] {identity.name if identity else f'#{user_id}'} tanildi → davomat buferiga")
 
-    att, created = Attendance.objects.get_or_create(
-        user=user, date=today,
-        defaults={'entry_time': now, 'last_seen': now, 'is_present': True}
-    )
-    if not created:
-        att.last_seen = now
-        att.is_present = True
-        att.save(update_fields=['last_seen', 'is_present'])
+    # Rasm: faqat sifati tekshirilgan bo‘lak; oynada eng yaxshisi qoladi, oyna yopilganda yoziladi
+    if face_crop is not None:
+        PHOTO_WRITER.offer(user_id, face_crop, photo_score, now)
 
-    ACTIVE_SESSIONS[user.id] = now
-    print(f"[TANISH] {user.full_name} tanildi → last_seen yangilandi")
+# ============================
+# DETECTION EXECUTOR — dlib ishlari event loopdan tashqarida
+# ============================
+def get_detection_executor():
+    """
+    DETECTION_EXECUTOR = "process" → har bir kamera alohida CPU yadrosida ishlaydi
+    DETECTION_EXECUTOR = "thread"  → fork qilib bo‘lmaydigan muhitlar uchun
+    """
+    global DETECTION_POOL
+    if DETECTION_POOL is None:
+        if DETECTION_EXECUTOR == "process":
+            # Daphne ichida threadlar bor → fork emas, spawn
+            DETECTION_POOL = ProcessPoolExecutor(
+                max_workers=DETECTION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            DETECTION_POOL = ThreadPoolExecutor(max_workers=DETECTION_WORKERS, thread_name_prefix="detect")
+        print(f"[DETECT] Executor: {DETECTION_EXECUTOR} ({DETECTION_WORKERS} ishchi)")
+    return DETECTION_POOL
 
-    # Rasm saqlash (faqat ma'lum vaqt oralig‘ida)
-    last_time = last_photo_cache.get(user.id)
-    if not last_time or (now - last_time).total_seconds() > PHOTO_INTERVAL:
-        _, buffer = cv2.imencode('.jpg', face_crop, [int(cv2.IMWRITE_JPEG_QUALITY), 95])
-        photo = AttendancePhoto(attendance=att)
-        filename = f"{user.username}_{uuid.uuid4().hex[:8]}.jpg"
-        photo.image.save(filename, ContentFile(buffer.tobytes()))
-        last_photo_cache[user.id] = now
-        print(f"[RASMI] {user.full_name} uchun rasm saqlandi → {filename}")
+# ============================
+# TANISH — track encodingini bazadagi encodinglar bilan solishtirish
+# ============================
+def is_match(distance, identity=None):
+    """Foydalanuvchida shaxsiy chegara (CustomUser.face_threshold) bo‘lsa o‘sha ishlatiladi"""
+    threshold = identity.threshold if identity is not None and identity.threshold else FACE_THRESHOLD
+    return distance < threshold and 1 - distance >= MIN_CONFIDENCE
+
+def match_encodings(gallery, encodings, partition=None, stats=None):
+    """
+    Kadrdagi barcha encodinglar → bitta matcher chaqiruvi (E @ G.T). [(idx, masofa), ...]
+    partition berilsa avval kamera bo‘limi qidiriladi, chegaradan o‘tmaganlar — butun galereyada.
+    """
+    if not encodings:
+        return []
+    queries = np.asarray(encodings, dtype=np.float32)
+    queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+
+    results = [None] * len(queries)
+    remaining = np.arange(len(queries))
+    if partition is not None:
+        part = gallery.partition(partition)
+        if len(part):
+            indices, distances = part.matcher.search_batch(queries)
+            for qi, (i, d) in enumerate(zip(indices[:, 0], distances[:, 0])):
+                row = int(part.rows[i]) if i >= 0 else -1
+                if row >= 0 and is_match(d, gallery.identity(row)):
+                    results[qi] = (row, float(d))
+            remaining = np.array([qi for qi, r in enumerate(results) if r is None], dtype=np.int64)
+            if stats is not None:
+                stats["partition_fallbacks"] += len(remaining)
+
+    if len(remaining):
+        indices, distances = gallery.matcher.search_batch(queries[remaining])
+        for qi, i, d in zip(remaining, indices[:, 0], distances[:, 0]):
+            results[qi] = (int(i), float(d))
+    return results
+
+def identify_track(track, match, gallery, frame, full_box):
+    """Track identifikatsiyasini yangilaydi; tanilmasa user = None"""
+    track.user = None
+    track.distance = None
+    track.crop_b64 = None
+
+    idx, min_dist = match
+    if idx < 0:
+        return
+
+    identity = gallery.identity(idx)
+    if identity is None:
+        return  # Foydalanuvchi o‘chirilgan, galereya hali yangilanmagan
+    if not is_match(min_dist, identity):
+        return  # Chegaradan o‘tmadi yoki ishonchsiz (55% dan past)
+
+    l, t, r, b = full_box
+    track.user = identity
+    track.distance = min_dist
+
+    # Overlay uchun kichik rasm — faqat tanilganda bir marta
+    crop_resized = cv2.resize(frame[t:b, l:r], (120, 120))  # Kichik o‘lcham → tez yuklanadi
+    _, buffer = cv2.imencode('.jpg', crop_resized, [int(cv2.IMWRITE_JPEG_QUALITY), 85])
+    track.crop_b64 = base64.b64encode(buffer).decode('utf-8')
+
+def region_pixels(regions, shape):
+    """0.0 - 1.0 nisbiy hududlar → kichik kadr piksellari"""
+    h, w = shape[:2]
+    return [
+        (int(x1 * w), int(y1 * h), int(round(x2 * w)), int(round(y2 * h)))
+        for x1, y1, x2, y2 in regions or []
+    ]
+
+def to_full_box(location, scale_x, scale_y):
+    t, r, b, l = location
+    return int(l * scale_x), int(t * scale_y), int(r * scale_x), int(b * scale_y)
+
+def face_crop_rgb(frame, full_box):
+    """
+    Yuz atrofidagi bo‘lakni kadrdan kesadi va faqat uni RGB ga o‘tkazadi.
+    Natija: (crop_rgb, crop ichidagi (top, right, bottom, left))
+    """
+    h, w = frame.shape[:2]
+    l, t, r, b = full_box
+    pad_x, pad_y = int((r - l) * ENCODE_CROP_MARGIN), int((b - t) * ENCODE_CROP_MARGIN)
+    x0, y0 = max(0, l - pad_x), max(0, t - pad_y)
+    x1, y1 = min(w, r + pad_x), min(h, b + pad_y)
+    crop = frame[y0:y1, x0:x1]
+
+    scale = 1.0
+    longest = max(crop.shape[:2])
+    if longest > ENCODE_CROP_MAX_SIZE:
+        scale = ENCODE_CROP_MAX_SIZE / longest
+        crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    location = (
+        int((t - y0) * scale), int((r - x0) * scale),
+        int((b - y0) * scale), int((l - x0) * scale),
+    )
+    return cv2.cvtColor(crop, cv2.COLOR_BGR2RGB), location
+
+async def analyze_frame(camera, seq, frame, executor):
+    """
+    Bitta kadr: HOG → tracker → faqat kerakli tracklar uchun encoding → tanish.
+    Natija: frontend uchun faces_data
+    """
+    loop = asyncio.get_running_loop()
+    stats = camera["stats"]
+    tracker = camera["tracker"]
+    camera_id = camera["capture"].camera_id
+
+    h, w = frame.shape[:2]
+    small_frame = cv2.resize(frame, (RESIZE_WIDTH, int(h * RESIZE_WIDTH / w)))
+    rgb_small = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+    scale_x = w / RESIZE_WIDTH
+    scale_y = h / small_frame.shape[0]
+
+    # Detektor kamera sozlamasidan (standart → HOG)
+    detector = camera["settings"].detector
+    regions = region_pixels(camera["settings"].detection_regions, small_frame.shape)
+    if regions:
+        # Faqat eshik / yo‘lak qismi → HOG narxi hudud maydoniga proporsional
+        locations = await loop.run_in_executor(executor, locate_faces_in_regions, rgb_small, regions, detector)
+    else:
+        locations = await loop.run_in_executor(executor, locate_faces, rgb_small, detector)
+
+    # Kichik yuzlarni rad etamiz → ular kuzatilmaydi ham
+    locations = [
+        loc for loc in locations
+        if (loc[2] - loc[0]) * scale_y >= MIN_FACE_SIZE and (loc[1] - loc[3]) * scale_x >= MIN_FACE_SIZE
+    ]
+
+    tracks = tracker.update(seq, locations)
+    now = time.monotonic()
+    pending = [t for t in tracks if tracker.needs_encoding(t, now)]
+
+    verified = set()                     # Shu kadrda sifati tekshirilib, tanilgan tracklar
+    if pending:
+        if ENCODE_FROM_FULL_RES:
+            # Kaskad: kichik kadrda topamiz, encoding esa to‘liq o‘lchamli bo‘lakdan → kichik yuzlar ham aniq
+            items = [face_crop_rgb(frame, to_full_box(t.location, scale_x, scale_y)) for t in pending]
+        else:
+            items = [face_crop_rgb(small_frame, to_full_box(t.location, 1, 1)) for t in pending]
+        # Xira, qorong‘i yoki burilgan yuz encoding qilinmaydi
+        min_quality = camera["settings"].quality_threshold
+        results = await loop.run_in_executor(executor, encode_face_crops, items, min_quality)
+        encoded = []
+        for track, (quality, enc) in zip(pending, results):
+            track.last_encoded = now
+            track.quality = {**quality, "rejected": enc is None}
+            if enc is None:
+                stats["low_quality"] += 1
+                continue  # Oldin tanilgan bo‘lsa identifikatsiya saqlanadi
+            stats["encodings"] += 1
+            encoded.append((track, enc))
+
+        # Galereya fonda yangilanadi → bu yerda faqat tayyor snapshot o‘qiladi
+        gallery = GALLERY.snapshot
+        # Auditoriya kamerasi → avval o‘z bo‘limi, topilmasa butun galereya
+        partition = camera["settings"].gallery_partition
+        matches = match_encodings(gallery, [enc for _, enc in encoded], partition, stats)
+        for (track, _), match in zip(encoded, matches):
+            identify_track(track, match, gallery, frame, to_full_box(track.location, scale_x, scale_y))
+            if track.user is not None:
+                verified.add(track.track_id)
+
+    faces_data = []
+    for track in tracks:
+        l, t, r, b = to_full_box(track.location, scale_x, scale_y)
+        if track.low_quality:
+            faces_data.append({
+                "name": "Past sifat",
+                "low_quality": True,
+                "quality": track.quality["score"],
+                "bbox": [l, t, r, b],
+                "track_id": track.track_id,
+            })
+            continue
+        if track.user is None:
+            continue
+        user = track.user
+
+        # process_recognition ni chaqiramiz — rasm faqat shu kadrda sifati tekshirilgan bo‘lsa
+        if track.track_id in verified:
+            score = shot_score(track.quality["sharpness"], b - t, 1 - track.distance)
+            process_recognition(user.id, camera_id, track.distance, track.track_id, frame[t:b, l:r], score)
+        else:
+            process_recognition(user.id, camera_id, track.distance, track.track_id)
+
+        # Endi frontendga yuboramiz — ixcham Identity dan, ORM murojaatisiz
+        faces_data.append({
+            "name": user.name,
+            "role": user.role,
+            "id": user.external_id,
+            "crop": track.crop_b64,
+            "bbox": [l, t, r, b],
+            "confidence": round((1 - track.distance) * 100, 1),
+            "track_id": track.track_id,
+        })
+
+    return faces_data
 
 # ============================
 # ASOSIY GENERATOR — HAR FRAMEda YUZ QIDIRADI!
 # ============================
 async def detect_faces(camera):
-    print("[DETECT] detect_faces generator ishga tushdi — HAR FRAMEda ishlaydi!")
-
-    while True:
-        async with camera["lock"]:
-            current_frame = camera["frame"]
-            frame = current_frame.copy() if current_frame is not None else None
-
-        if frame is None:
-            await asyncio.sleep(FRAME_INTERVAL)
-            continue
-
-        faces_data = []
-        h, w = frame.shape[:2]
-        small_frame = cv2.resize(frame, (RESIZE_WIDTH, int(h * RESIZE_WIDTH / w)))
-        rgb_small = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
-
-        # Tez va aniq model → HOG (real-time uchun ideal)
-        locations = face_recognition.face_locations(rgb_small, model="hog")
-        encodings = face_recognition.face_encodings(rgb_small, locations)
-
-        known_enc, known_users = await get_latest_encodings()
-
-        for (t, r, b, l), enc in zip(locations, encodings):
-            # Kattalashtirish
-            scale_x = w / RESIZE_WIDTH
-            scale_y = h / small_frame.shape[0]
-            l, r, t, b = int(l * scale_x), int(r * scale_x), int(t * scale_y), int(b * scale_y)
-
-            if (b - t) < MIN_FACE_SIZE or (r - l) < MIN_FACE_SIZE:
+    """
+    Kadrlar RateController muddatlari bo‘yicha yield qilinadi (preview to‘xtamaydi).
+    Aniqlash executorga yuboriladi — kamera maqsadli tezligida va
+    MAX_INFLIGHT_PER_CAMERA dan ko‘p ish navbatda tursa, kadr aniqlashsiz o‘tkazib yuboriladi.
+    MAX_FRAME_AGE dan eski kadr umuman qayta ishlanmaydi.
+    Ramkalar oxirgi tugagan aniqlash natijasidan olinadi.
+    """
+    print("[DETECT] detect_faces generator ishga tushdi")
+
+    executor = get_detection_executor()
+    stats = camera["stats"]
+    rate = camera["rate"]
+    inflight = []                        # [(seq, boshlangan vaqt, task), ...]
+    faces_data = []
+    applied_seq = 0
+    last_seq = 0
+
+    try:
+        while True:
+            # Capture thread kadrni hech qachon o‘zgartirmaydi → nusxa kerak emas
+            seq, captured_at, frame = camera["capture"].latest()
+            if frame is None or seq == last_seq:
+                await asyncio.sleep(IDLE_POLL_INTERVAL)
                 continue
-
-            # Masofa hisoblash
-            if len(known_enc) == 0:
+            last_seq = seq
+            now = time.monotonic()
+            if now - captured_at > MAX_FRAME_AGE:
+                stats["stale_dropped"] += 1   # Kechikib ishlagandan ko‘ra tashlagan yaxshi
                 continue
+            stats["frames"] += 1
+
+            # Tugagan aniqlashlar → ramkalar yangilanadi
+            still_running = []
+            for job_seq, started, task in inflight:
+                if not task.done():
+                    still_running.append((job_seq, started, task))
+                    continue
+                rate.observe("detect", now - started)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    print(f"[XATO] Aniqlashda xato (seq {job_seq}): {e}")
+                    continue
+                if job_seq < applied_seq:
+                    continue  # Kechikkan natija → eskisi yangisini bosmasin
+                applied_seq = job_seq
+                faces_data = result
+            inflight = still_running
+
+            # Yangi kadrni aniqlashga yuborish — vaqti kelmagan yoki navbat to‘la bo‘lsa o‘tkazib yuboramiz,
+            # harakat bo‘lmasa (va keep-alive vaqti kelmagan bo‘lsa) HOG umuman ishlamaydi
+            if not rate.should_detect(now):
+                pass
+            elif len(inflight) >= MAX_INFLIGHT_PER_CAMERA:
+                stats["detect_skipped"] += 1
+            elif camera["motion"].check(frame, now):
+                rate.detect_started(now)
+                inflight.append((seq, now, asyncio.create_task(analyze_frame(camera, seq, frame, executor))))
+                stats["detections"] += 1
+
+            yield seq, frame, faces_data
+            await asyncio.sleep(rate.wait_time(time.monotonic()))
+    finally:
+        for *_, task in inflight:
+            task.cancel()
 
-            enc_norm = enc / np.linalg.norm(enc)
-            distances = np.linalg.norm(known_enc - enc_norm, axis=1)
-            min_dist = np.min(distances)
-            idx = np.argmin(distances)
-
-            if min_dist >= FACE_THRESHOLD:
-                continue  # Bu yerda rad etamiz
-
-            confidence = 1 - min_dist
-            if confidence < 0.55:  # 55% dan past → ishonchsiz
+# ============================
+# KAMERA PIPELINE — 1 kamera = 1 ta aniqlash, natija hammaga tarqatiladi
+# ============================
+def encode_preview(frame):
+    success, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), PREVIEW_JPEG_QUALITY])
+    if not success:
+        return None
+    return base64.b64encode(buffer).decode()
+
+async def run_camera_pipeline(camera):
+    """
+    detect_faces() faqat shu yerda ishlaydi.
+    Har bir kadr JPEG + JSON ga bir marta aylantiriladi va
+    Broadcaster orqali barcha ulangan CameraStreamConsumer larga yuboriladi.
+    """
+    camera_id = camera["capture"].camera_id
+    rate = camera["rate"]
+    print(f"[PIPELINE] Kamera {camera_id} pipeline ishga tushdi")
+    try:
+        async for seq, frame, faces in detect_faces(camera):
+            started = time.monotonic()
+            frame_b64 = await asyncio.to_thread(encode_preview, frame)
+            if frame_b64 is None:
                 continue
 
-            user = known_users[idx]
-            face_crop = frame[t:b, l:r]
-
-            # process_recognition ni chaqiramiz
-            asyncio.create_task(process_recognition(user, face_crop))
-
-            # ← MANA SHU YERDA crop_b64 yaratiladi!
-            crop_resized = cv2.resize(face_crop, (120, 120))  # Kichik o‘lcham → tez yuklanadi
-            _, buffer = cv2.imencode('.jpg', crop_resized, [int(cv2.IMWRITE_JPEG_QUALITY), 85])
-            crop_b64 = base64.b64encode(buffer).decode('utf-8')  # ← ANIQLIK UCHUN!
-
-            # Endi frontendga yuboramiz
-            faces_data.append({
-                "name": user.full_name or user.username,
-                "role": getattr(user, 'get_role_display', lambda: "Noma'lum")(),
-                "id": user.student_id_number or user.employee_id_number or str(user.id),
-                "crop": crop_b64,  # ← BU YERDA ISHLATILADI
-                "bbox": [l, t, r, b],
-                "confidence": round(confidence * 100, 1)
-            })
-
-        yield frame, faces_data
-        await asyncio.sleep(FRAME_INTERVAL)
+            camera["broadcaster"].publish(json.dumps({
+                "type": "frame",
+                "seq": seq,
+                "frame": frame_b64,
+                "detected_faces": faces or [],  # Har doim list bo‘lsin
+                "fps": round(rate.effective_fps(), 1),
+                "detect_fps": round(rate.effective_detect_fps(), 1),
+            }, ensure_ascii=False))
+
+            finished = time.monotonic()
+            rate.observe("preview", finished - started)
+            rate.frame_published(finished)
+    except asyncio.CancelledError:
+        print(f"[PIPELINE] Kamera {camera_id} pipeline to‘xtatildi")
+        raise
+    except Exception as e:
+        print(f"[XATO] Kamera {camera_id} pipeline xatosi: {e}")
 
 # ============================
 # BACKGROUND TASK — server ishga tushganda
@@ -247,4 +559,9 @@ async def detect_faces(camera):
 def start_background_tasks():
     loop = asyncio.get_event_loop()
     loop.create_task(auto_exit_detector())
+    GALLERY.ensure_refresher(loop)
+    ATTENDANCE_BUFFER.ensure_flusher(loop)
+    PRESENCE.ensure_sync(loop)
+    PHOTO_WRITER.ensure_workers(loop)
+    ensure_settings_watcher(loop)
     print("[BACKGROUND] auto_exit_detector ishga tushdi!")
\ No newline at end of file
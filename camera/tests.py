@@ -1,3 +1,466 @@
-from django.test import TestCase
+# camera/tests.py — galereya qidiruvi, davomat buferi va rasm oynalari
+#
+# Batch GEMM qidiruv eski har-yuz-uchun np.linalg.norm sikli bilan bir xil natija berishi kerak:
+# indekslar aynan, masofalar float32 yaxlitlash chegarasida. Matcher testlari faqat numpy,
+# bufer / galereya / rasm testlari test DB da ishlaydi.
 
-# Create your tests here.
+import asyncio
+import tempfile
+import time
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from attendance.models import Attendance, AttendancePhoto, RecognitionEvent
+from camera.gallery import FaceGallery, GallerySnapshot
+from camera.identities import Identity, IdentityTable
+from camera.matching import QUANT_BLOCK_ROWS, ExactMatcher, QuantizedMatrix, TemplateMatcher
+from camera.photos import PhotoWriter
+from camera.presence import MemoryPresenceStore
+from camera.recorder import ATTENDANCE_MAX_RETRIES, AttendanceBuffer
+from camera.tasks import is_match, match_encodings
+from users.models import CustomUser, FaceEncoding
+
+DIM = 128
+
+
+def normalized(rng, n):
+    vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def near(rng, gallery, rows, noise=0.05):
+    """Galereya qatorlari + shovqin → yangi kadrdagi yuz o‘rnida"""
+    queries = gallery[rows] + rng.standard_normal((len(rows), DIM)).astype(np.float32) * noise
+    return (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+
+def brute_force(gallery, queries, k):
+    """Oldingi usul: har yuz uchun butun galereyaga np.linalg.norm"""
+    indices, distances = [], []
+    for query in queries:
+        d = np.linalg.norm(gallery - query, axis=1)
+        order = np.argsort(d, kind="stable")[:k]
+        indices.append(order)
+        distances.append(d[order])
+    return np.array(indices), np.array(distances)
+
+
+class ExactMatcherTests(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(7)
+        self.gallery = normalized(self.rng, 500)
+        self.queries = np.vstack([
+            near(self.rng, self.gallery, self.rng.integers(0, 500, 12)),
+            normalized(self.rng, 4),     # Hech kimga o‘xshamaydigan yuzlar
+        ])
+
+    def test_search_batch_matches_brute_force(self):
+        for k in (1, 3):
+            indices, distances = ExactMatcher(self.gallery, precision="float32").search_batch(self.queries, k)
+            expected_idx, expected_dist = brute_force(self.gallery, self.queries, k)
+            np.testing.assert_array_equal(indices, expected_idx)
+            np.testing.assert_allclose(distances, expected_dist, atol=1e-5)
+
+    def test_search_matches_batch_row(self):
+        matcher = ExactMatcher(self.gallery, precision="float32")
+        indices, distances = matcher.search_batch(self.queries)
+        for qi, query in enumerate(self.queries):
+            idx, distance = matcher.search(query)
+            self.assertEqual(idx, indices[qi, 0])
+            self.assertAlmostEqual(distance, float(distances[qi, 0]), places=5)
+
+    def test_quantized_top1_matches_brute_force(self):
+        expected_idx, expected_dist = brute_force(self.gallery, self.queries, 1)
+        for precision in ("bfloat16", "int8"):
+            indices, distances = ExactMatcher(self.gallery, precision=precision).search_batch(self.queries)
+            np.testing.assert_array_equal(indices, expected_idx)
+            # Nomzodlar float32 da qayta baholanadi → masofa aniq
+            np.testing.assert_allclose(distances, expected_dist, atol=1e-5)
+
+    def test_index_without_float32_copy(self):
+        # TemplateMatcher markazlar indeksi: faqat kodlar saqlanadi → xotira haqiqatan kamayadi
+        for precision, ratio in (("bfloat16", 2), ("int8", 4)):
+            matcher = ExactMatcher(self.gallery, precision=precision, rerank_exact=False)
+            self.assertIsNone(matcher.encodings)
+            self.assertLessEqual(matcher.nbytes * ratio, self.gallery.nbytes * 1.05)
+            indices, _ = matcher.search_batch(self.queries[:12])
+            expected_idx, _ = brute_force(self.gallery, self.queries[:12], 1)
+            np.testing.assert_array_equal(indices, expected_idx)
+
+    def test_quantized_dot_across_blocks(self):
+        # Bir nechta blok + oxirgi to‘liq bo‘lmagan blok, rows bilan (IVF) ham
+        gallery = normalized(self.rng, QUANT_BLOCK_ROWS * 2 + 37)
+        rows = self.rng.choice(len(gallery), QUANT_BLOCK_ROWS + 5, replace=False)
+        expected = self.queries @ gallery.T
+        for precision, atol in (("bfloat16", 1e-2), ("int8", 3e-2)):
+            codes = QuantizedMatrix(gallery, precision)
+            np.testing.assert_allclose(codes.dot(self.queries), expected, atol=atol)
+            np.testing.assert_allclose(codes.dot(self.queries, rows), expected[:, rows], atol=atol)
+
+    def test_float16_alias(self):
+        # Eski FACE_GALLERY_PRECISION=float16 sozlamasi bfloat16 kodlariga tushadi
+        codes = QuantizedMatrix(self.gallery, "float16")
+        self.assertEqual(codes.precision, "bfloat16")
+        self.assertEqual(codes.nbytes * 2, self.gallery.nbytes)
+
+    def test_padding_when_gallery_is_small(self):
+        indices, distances = ExactMatcher(self.gallery[:2], precision="float32").search_batch(self.queries, 4)
+        self.assertTrue((indices[:, 2:] == -1).all())
+        self.assertTrue(np.isinf(distances[:, 2:]).all())
+        self.assertTrue((indices[:, :2] >= 0).all())
+
+    def test_empty_gallery(self):
+        matcher = ExactMatcher(np.empty((0, DIM), dtype=np.float32), precision="float32")
+        indices, distances = matcher.search_batch(self.queries)
+        self.assertTrue((indices == -1).all())
+        self.assertTrue(np.isinf(distances).all())
+        self.assertEqual(matcher.search(self.queries[0]), (-1, float("inf")))
+
+
+class TemplateMatcherTests(unittest.TestCase):
+    def setUp(self):
+        rng = self.rng = np.random.default_rng(11)
+        # 60 foydalanuvchi, har birida 1-5 shablon (bitta odamning shablonlari bir-biriga yaqin)
+        base = normalized(rng, 60)
+        counts = rng.integers(1, 6, len(base))
+        self.owners = np.repeat(np.arange(100, 100 + len(base)), counts).astype(np.int64)
+        templates = np.repeat(base, counts, axis=0) + rng.standard_normal((counts.sum(), DIM)).astype(np.float32) * 0.15
+        self.gallery = (templates / np.linalg.norm(templates, axis=1, keepdims=True)).astype(np.float32)
+        self.queries = near(rng, self.gallery, rng.integers(0, len(self.gallery), 20))
+
+    def test_full_shortlist_matches_brute_force(self):
+        # Qisqa ro‘yxat barcha foydalanuvchilarni qamrasa natija butun shablonlar bo‘yicha qidiruv bilan bir xil
+        matcher = TemplateMatcher(self.gallery, self.owners, backend="exact", shortlist=60)
+        expected_idx, expected_dist = brute_force(self.gallery, self.queries, 1)
+        indices, distances = matcher.search_batch(self.queries)
+        np.testing.assert_array_equal(indices, expected_idx)
+        np.testing.assert_allclose(distances, expected_dist, atol=1e-5)
+
+    def test_default_shortlist_finds_nearest_template(self):
+        matcher = TemplateMatcher(self.gallery, self.owners, backend="exact")
+        expected_idx, expected_dist = brute_force(self.gallery, self.queries, 1)
+        indices, distances = matcher.search_batch(self.queries)
+        np.testing.assert_array_equal(indices, expected_idx)
+        np.testing.assert_allclose(distances, expected_dist, atol=1e-5)
+
+    def test_owner_of_result_row(self):
+        matcher = TemplateMatcher(self.gallery, self.owners, backend="exact")
+        indices, _ = matcher.search_batch(self.queries)
+        expected_idx, _ = brute_force(self.gallery, self.queries, 1)
+        np.testing.assert_array_equal(self.owners[indices[:, 0]], self.owners[expected_idx[:, 0]])
+
+
+class MatchEncodingsTests(SimpleTestCase):
+    """Kadrdagi barcha yuzlar bitta search_batch bilan — qaror eski har-yuz sikli bilan bir xil"""
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.encodings = normalized(rng, 40)
+        user_ids = list(range(1, 41))
+        identities = IdentityTable({
+            user_id: Identity(user_id, f"user{user_id}", f"User {user_id}", "Talaba", str(user_id),
+                              department="A" if user_id <= 20 else "B")
+            for user_id in user_ids
+        })
+        self.gallery = GallerySnapshot(1, self.encodings, user_ids, user_ids, identities)
+        # 3 ta tanish yuz (ikkitasi A bo‘limida, bittasi B da) + 2 ta begona; dlib kabi float64 ro‘yxat
+        frame = np.vstack([near(rng, self.encodings, [3, 17, 25], noise=0.03), normalized(rng, 2)])
+        self.frame = [row.astype(np.float64) for row in frame]
+
+    def per_face(self):
+        """Oldingi usul: har yuz uchun butun galereyaga np.linalg.norm va argmin"""
+        results = []
+        for encoding in self.frame:
+            distances = np.linalg.norm(self.encodings - encoding, axis=1)
+            idx = int(np.argmin(distances))
+            results.append((idx, float(distances[idx])))
+        return results
+
+    def assert_same_decisions(self, results):
+        expected = self.per_face()
+        self.assertEqual([idx for idx, _ in results], [idx for idx, _ in expected])
+        for (idx, distance), (_, expected_distance) in zip(results, expected):
+            self.assertAlmostEqual(distance, expected_distance, places=5)
+            identity = self.gallery.identity(idx)
+            self.assertEqual(is_match(distance, identity), is_match(expected_distance, identity))
+
+    def test_batch_matches_per_face_loop(self):
+        results = match_encodings(self.gallery, self.frame)
+        self.assert_same_decisions(results)
+        self.assertEqual([is_match(d) for _, d in results], [True, True, True, False, False])
+
+    def test_partition_falls_back_to_full_gallery(self):
+        stats = {"partition_fallbacks": 0}
+        results = match_encodings(self.gallery, self.frame, partition=(("A",), ()), stats=stats)
+        self.assert_same_decisions(results)
+        # B bo‘limidagi yuz va 2 ta begona bo‘lim ichida chegaradan o‘tmaydi
+        self.assertEqual(stats["partition_fallbacks"], 3)
+
+    def test_empty_frame(self):
+        self.assertEqual(match_encodings(self.gallery, []), [])
+
+
+class GalleryDeltaTests(TestCase):
+    def setUp(self):
+        self.vectors = normalized(np.random.default_rng(9), 3)
+        self.users = [CustomUser.objects.create(username=f"user{i}", full_name=f"User {i}") for i in range(3)]
+        self.rows = [
+            FaceEncoding.objects.create(user=user, encoding=FaceEncoding.pack(vector))
+            for user, vector in zip(self.users, self.vectors)
+        ]
+        self.gallery = FaceGallery()
+        self.gallery.load_full()
+
+    def search(self, vector):
+        idx, _ = self.gallery.snapshot.matcher.search(vector)
+        return self.gallery.snapshot.row_ids[idx] if idx >= 0 else None
+
+    def test_rename_refreshes_identity(self):
+        user = CustomUser.objects.get(pk=self.users[1].pk)
+        user.full_name = "Yangi Ism"
+        user.save()
+        version = self.gallery.snapshot.version
+        self.gallery.apply_deltas()
+        snap = self.gallery.snapshot
+        self.assertEqual(snap.version, version + 1)
+        self.assertEqual(snap.identities.get(user.id).name, "Yangi Ism")
+        self.assertEqual(snap.identities.get(self.users[0].id).name, "User 0")
+        self.assertEqual(len(snap), 3)
+
+    def test_unrelated_save_keeps_snapshot(self):
+        user = CustomUser.objects.get(pk=self.users[1].pk)
+        user.last_login = timezone.now()
+        user.save(update_fields=["last_login"])
+        version = self.gallery.snapshot.version
+        self.gallery.apply_deltas()
+        self.assertEqual(self.gallery.snapshot.version, version)
+
+    def test_delete_from_other_process(self):
+        # Yangilovchi task yo‘q → post_delete navbatga qo‘yilmaydi, o‘chirish soni bo‘yicha topiladi
+        self.rows[0].delete()
+        self.gallery.apply_deltas()
+        snap = self.gallery.snapshot
+        self.assertEqual(len(snap), 2)
+        self.assertNotIn(self.rows[0].id, snap.index)
+        self.assertIsNone(snap.identities.get(self.users[0].id))
+        self.assertNotEqual(self.search(self.vectors[0]), self.rows[0].id)
+        self.assertEqual(self.search(self.vectors[2]), self.rows[2].id)
+
+    def test_added_template_and_delete_in_one_delta(self):
+        new_row = FaceEncoding.objects.create(user=self.users[0], encoding=FaceEncoding.pack(self.vectors[0] + 0.05))
+        self.rows[1].delete()
+        self.gallery.apply_deltas()
+        snap = self.gallery.snapshot
+        self.assertEqual(sorted(snap.row_ids), sorted([self.rows[0].id, self.rows[2].id, new_row.id]))
+        self.assertEqual(int(snap.user_ids[snap.index[new_row.id]]), self.users[0].id)
+
+
+def noon():
+    """Bugun 12:00 — barcha vaqtlar bitta kunga tushadi"""
+    return timezone.localtime().replace(hour=12, minute=0, second=0, microsecond=0)
+
+
+def event(user_id, seen_at, distance=0.4, camera_id=0, hits=1):
+    """AttendanceBuffer ichidagi hodisa ro‘yxati"""
+    return [user_id, camera_id, seen_at, distance, 1, hits, 0]
+
+
+class AttendanceBufferWriteTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username="ali")
+        self.t0 = noon()
+
+    def test_first_write_creates_then_updates(self):
+        self.assertEqual(AttendanceBuffer.write([event(self.user.id, self.t0)]), (1, 1, 0, 0))
+        att = Attendance.objects.get(user=self.user)
+        # bulk_create dagi auto_now emas — ko‘rilgan vaqt
+        self.assertEqual((att.entry_time, att.last_seen), (self.t0, self.t0))
+
+        later = self.t0 + timedelta(seconds=30)
+        self.assertEqual(AttendanceBuffer.write([event(self.user.id, later)]), (1, 0, 1, 0))
+        att.refresh_from_db()
+        self.assertEqual((att.entry_time, att.last_seen), (self.t0, later))
+        self.assertEqual(RecognitionEvent.objects.count(), 2)
+
+    def test_retried_old_batch_does_not_move_last_seen_back(self):
+        later = self.t0 + timedelta(minutes=1)
+        AttendanceBuffer.write([event(self.user.id, later)])
+        # Avval yozilmay qolgan (qayta yuborilgan) partiya kechroq keladi
+        AttendanceBuffer.write([event(self.user.id, self.t0)])
+        att = Attendance.objects.get(user=self.user)
+        self.assertEqual(att.last_seen, later)
+        self.assertEqual(att.entry_time, self.t0)
+
+    def test_restore_caps_retries(self):
+        buffer = AttendanceBuffer(coalesce=0)
+        buffer.record(self.user.id, self.t0, 0, 0.4, 1)
+        with mock.patch.object(AttendanceBuffer, "write", side_effect=RuntimeError("db down")):
+            for attempt in range(1, ATTENDANCE_MAX_RETRIES + 1):
+                asyncio.run(buffer.flush())
+                self.assertEqual(buffer.stats["errors"], attempt)
+        self.assertEqual(buffer.snapshot()["pending"], 0)
+        self.assertEqual(buffer.stats["expired"], 1)
+
+    def test_restore_keeps_earliest_time_and_best_distance(self):
+        buffer = AttendanceBuffer(coalesce=1)
+        buffer.record(self.user.id, self.t0 + timedelta(seconds=0.5), 0, 0.30, 7)
+        batch, oldest = buffer._take()
+        # Flush paytida shu oraliqda yangi kadr keldi, keyin flush muvaffaqiyatsiz
+        buffer.record(self.user.id, self.t0 + timedelta(seconds=0.8), 0, 0.45, 8)
+        buffer._restore(batch, oldest)
+        (pending,) = buffer._events.values()
+        self.assertEqual(pending[2], self.t0 + timedelta(seconds=0.5))
+        self.assertEqual((pending[3], pending[4], pending[5], pending[6]), (0.30, 7, 2, 1))
+
+
+class RecognitionLogTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username="ali")
+        self.t0 = noon()
+
+    def test_coalesces_frames_per_user_camera_second(self):
+        buffer = AttendanceBuffer(coalesce=1)
+        for offset, distance, track_id in ((0.1, 0.40, 1), (0.3, 0.35, 2), (0.6, 0.45, 3)):
+            buffer.record(self.user.id, self.t0 + timedelta(seconds=offset), 0, distance, track_id)
+        buffer.record(self.user.id, self.t0 + timedelta(seconds=0.2), 1, 0.5, 4)       # Boshqa kamera
+        buffer.record(self.user.id, self.t0 + timedelta(seconds=1.1), 0, 0.5, 5)       # Keyingi soniya
+        self.assertEqual(buffer.snapshot()["pending"], 3)
+        self.assertEqual(buffer.stats["coalesced"], 2)
+
+        self.assertEqual(AttendanceBuffer.write(list(buffer._events.values())), (3, 1, 0, 0))
+        first = RecognitionEvent.objects.get(camera_id=0, ts=self.t0 + timedelta(seconds=0.1))
+        self.assertEqual((first.hits, first.distance, first.track_id), (3, 0.35, 2))
+        att = Attendance.objects.get(user=self.user)
+        self.assertEqual(att.entry_time, self.t0 + timedelta(seconds=0.1))
+        self.assertEqual(att.last_seen, self.t0 + timedelta(seconds=1.1))
+
+    def test_every_frame_when_coalescing_is_off(self):
+        buffer = AttendanceBuffer(coalesce=0)
+        for offset in (0.1, 0.2, 0.3):
+            buffer.record(self.user.id, self.t0 + timedelta(seconds=offset), 0, 0.4, 1)
+        self.assertEqual(AttendanceBuffer.write(list(buffer._events.values()))[0], 3)
+        self.assertEqual(RecognitionEvent.objects.count(), 3)
+
+    def test_sighting_before_exit_does_not_reopen(self):
+        exit_time = self.t0 + timedelta(minutes=5)
+        att = Attendance.objects.create(user=self.user, date=self.t0.date(), entry_time=self.t0, is_present=False)
+        Attendance.objects.filter(pk=att.pk).update(last_seen=self.t0 + timedelta(minutes=2), exit_time=exit_time)
+
+        # Auto-exit dan oldingi ko‘rinish kech yozildi (qayta yuborilgan partiya)
+        AttendanceBuffer.write([event(self.user.id, self.t0 + timedelta(minutes=3))])
+        att.refresh_from_db()
+        self.assertEqual((att.is_present, att.exit_time), (False, exit_time))
+        self.assertEqual(att.last_seen, self.t0 + timedelta(minutes=3))
+
+        # Chiqqandan keyin yana ko‘rindi → qayta ochiladi
+        AttendanceBuffer.write([event(self.user.id, self.t0 + timedelta(minutes=10))])
+        att.refresh_from_db()
+        self.assertEqual((att.is_present, att.exit_time), (True, None))
+
+
+class AttendanceBufferOrphanTests(TransactionTestCase):
+    # FK tekshiruvi commit paytida (SQLite / PostgreSQL deferred) → haqiqiy tranzaksiya kerak
+
+    def test_events_of_deleted_user_are_dropped(self):
+        user = CustomUser.objects.create(username="ali")
+        gone = CustomUser.objects.create(username="vali")
+        gone_id = gone.id
+        gone.delete()                    # Galereya hali yangilanmagan — bufer eski user_id ni ushlab turibdi
+
+        result = AttendanceBuffer.write([event(user.id, noon()), event(gone_id, noon())])
+        self.assertEqual(result, (1, 1, 0, 1))
+        self.assertEqual(list(RecognitionEvent.objects.values_list("user_id", flat=True)), [user.id])
+
+
+class MemoryPresenceStoreTests(unittest.TestCase):
+    def test_pop_expired_prunes_old_photo_slots(self):
+        store = MemoryPresenceStore()
+        now = time.time()
+        asyncio.run(store.claim_photo(1, now - 120, 60))
+        asyncio.run(store.claim_photo(2, now - 10, 60))
+        store.touch(1, now - 120)
+        store.touch(2, now - 10)
+
+        self.assertEqual(asyncio.run(store.pop_expired(now - 60)), [1])
+        self.assertEqual(list(store.last_seen), [2])
+        # 1 ning rasm vaqti intervaldan eski → o‘chirildi, 2 niki hali navbatni band qiladi
+        self.assertEqual(list(store.last_photo), [2])
+        self.assertFalse(asyncio.run(store.claim_photo(2, now, 60)))
+
+
+class PhotoWindowTests(SimpleTestCase):
+    def setUp(self):
+        self.writer = PhotoWriter(interval=20)
+        self.writer._queue = asyncio.Queue(maxsize=8)
+        self.t0 = noon()
+
+    def crop(self, value):
+        return np.full((40, 40, 3), value, dtype=np.uint8)
+
+    def offer(self, offset, score, value):
+        self.writer.offer(7, self.crop(value), score, self.t0 + timedelta(seconds=offset), now=offset)
+
+    def queued(self):
+        items = []
+        while not self.writer._queue.empty():
+            items.append(self.writer._queue.get_nowait())
+        return items
+
+    def test_only_best_shot_of_window_is_queued(self):
+        self.offer(0, 0.2, 10)
+        self.offer(5, 0.9, 20)
+        self.offer(12, 0.5, 30)
+        self.assertEqual(self.writer.close_windows(now=19), 0)
+        self.assertEqual(self.writer.close_windows(now=20), 1)
+
+        (item,) = self.queued()
+        user_id, crop, seen_at, slot = item
+        self.assertEqual((user_id, int(crop[0, 0, 0]), seen_at), (7, 20, self.t0 + timedelta(seconds=5)))
+        # Navbat oyna ochilgan vaqt bilan olinadi, g‘olib kadr vaqti bilan emas
+        self.assertEqual(slot, self.t0.timestamp())
+
+    def test_consecutive_windows_each_claim_a_slot(self):
+        store = MemoryPresenceStore()
+        self.offer(0, 0.1, 10)
+        self.offer(18, 0.9, 20)          # 1-oyna g‘olibi oxirida
+        self.writer.close_windows(now=20)
+        self.offer(20, 0.3, 30)
+        self.offer(21, 0.8, 40)          # 2-oyna g‘olibi 3 s keyin
+        self.writer.close_windows(now=40)
+
+        claims = [asyncio.run(store.claim_photo(user_id, slot, self.writer.interval))
+                  for user_id, _, _, slot in self.queued()]
+        self.assertEqual(claims, [True, True])
+        # Boshqa ishchi shu oynada ochgan navbat esa rad etiladi
+        self.assertFalse(asyncio.run(store.claim_photo(7, self.t0.timestamp() + 25, self.writer.interval)))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class PhotoWriteTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username="ali")
+        self.t0 = noon()
+
+    def test_photo_before_buffer_flush_creates_row_via_recorder(self):
+        seen_at = self.t0 + timedelta(seconds=5)
+        PhotoWriter(interval=20).write(self.user.id, np.zeros((40, 40, 3), dtype=np.uint8), seen_at)
+        att = Attendance.objects.get(user=self.user)
+        # auto_now emas — rasm kadrining vaqti
+        self.assertEqual((att.entry_time, att.last_seen, att.is_present), (seen_at, seen_at, True))
+        self.assertEqual(AttendancePhoto.objects.get().attendance_id, att.id)
+
+        # Bufer keyin flush bo‘ladi: birinchi ko‘rinish rasmdan oldin edi → entry_time tuzatiladi
+        self.assertEqual(AttendanceBuffer.write([event(self.user.id, self.t0)]), (1, 0, 1, 0))
+        att.refresh_from_db()
+        self.assertEqual((att.entry_time, att.last_seen), (self.t0, seen_at))
+
+    def test_photo_attaches_to_existing_row(self):
+        AttendanceBuffer.write([event(self.user.id, self.t0)])
+        PhotoWriter(interval=20).write(self.user.id, np.zeros((40, 40, 3), dtype=np.uint8), self.t0)
+        self.assertEqual(Attendance.objects.count(), 1)
+        self.assertEqual(AttendancePhoto.objects.get().attendance.user_id, self.user.id)
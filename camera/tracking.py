@@ -0,0 +1,115 @@
+# camera/tracking.py — aniqlashlar orasida yuzlarni kuzatish (IoU tracker)
+#
+# Har bir track o‘z identifikatsiyasini saqlaydi. Encoding faqat quyidagi hollarda hisoblanadi:
+#   • track yangi (yoki yo‘qolib qayta paydo bo‘lgan) bo‘lsa,
+#   • tanilmagan track uchun TRACK_UNKNOWN_RETRY soniya o‘tgan bo‘lsa,
+#   • tanilgan track uchun TRACK_REVERIFY_INTERVAL soniyada bir marta qayta tekshiruv.
+
+import itertools
+
+import numpy as np
+
+# ============================
+# SOZLAMALAR
+# ============================
+TRACK_IOU_THRESHOLD = 0.3                # Shundan past IoU → boshqa yuz
+TRACK_MAX_MISSES = 5                     # Ketma-ket shuncha aniqlashda ko‘rinmasa → track o‘chadi
+TRACK_REVERIFY_INTERVAL = 10.0           # Tanilgan yuz har 10 soniyada qayta encoding qilinadi
+TRACK_UNKNOWN_RETRY = 1.0                # Tanilmagan yuz uchun qayta urinish oralig‘i
+
+
+class Track:
+    __slots__ = (
+        "track_id", "location", "user", "distance", "crop_b64",
+        "quality", "misses", "last_encoded", "last_seen_seq",
+    )
+
+    def __init__(self, track_id, location):
+        self.track_id = track_id
+        self.location = location         # (top, right, bottom, left) — kichik kadr koordinatalari
+        self.user = None                 # camera.identities.Identity — tanilmagan bo‘lsa None
+        self.distance = None
+        self.crop_b64 = None
+        self.quality = None              # Oxirgi encoding urinishidagi sifat bahosi (dict)
+        self.misses = 0
+        self.last_encoded = None         # time.monotonic()
+        self.last_seen_seq = 0
+
+    @property
+    def visible(self):
+        return self.misses == 0
+
+    @property
+    def low_quality(self):
+        return self.user is None and self.quality is not None and self.quality.get("rejected", False)
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """(top, right, bottom, left) qutilar orasidagi IoU matritsasi"""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    top = np.maximum(a[:, None, 0], b[None, :, 0])
+    right = np.minimum(a[:, None, 1], b[None, :, 1])
+    bottom = np.minimum(a[:, None, 2], b[None, :, 2])
+    left = np.maximum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(right - left, 0, None) * np.clip(bottom - top, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 1] - a[:, 3])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 1] - b[:, 3])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+class FaceTracker:
+    """Kamera uchun bitta tracker — faqat kamera pipeline ichidan chaqiriladi"""
+
+    def __init__(self, iou_threshold=TRACK_IOU_THRESHOLD, max_misses=TRACK_MAX_MISSES):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.tracks = []
+        self._ids = itertools.count(1)
+        self._last_seq = 0
+
+    def update(self, seq, locations):
+        """
+        Yangi aniqlash natijasini mavjud tracklarga biriktiradi (greedy IoU).
+        Ko‘rinib turgan tracklar ro‘yxatini qaytaradi. Kechikkan (eski seq) natija e’tiborsiz qoldiriladi.
+        """
+        if seq < self._last_seq:
+            return [t for t in self.tracks if t.visible]
+        self._last_seq = seq
+
+        matched_tracks, matched_boxes = set(), set()
+        if self.tracks and locations:
+            ious = iou_matrix([t.location for t in self.tracks], locations)
+            for flat in np.argsort(ious, axis=None)[::-1]:
+                ti, bi = np.unravel_index(flat, ious.shape)
+                if ious[ti, bi] < self.iou_threshold:
+                    break
+                if ti in matched_tracks or bi in matched_boxes:
+                    continue
+                matched_tracks.add(ti)
+                matched_boxes.add(bi)
+                track = self.tracks[ti]
+                track.location = tuple(locations[bi])
+                track.misses = 0
+                track.last_seen_seq = seq
+
+        for ti, track in enumerate(self.tracks):
+            if ti not in matched_tracks:
+                track.misses += 1
+
+        for bi, location in enumerate(locations):
+            if bi not in matched_boxes:
+                track = Track(next(self._ids), tuple(location))
+                track.last_seen_seq = seq
+                self.tracks.append(track)
+
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+        return [t for t in self.tracks if t.visible]
+
+    @staticmethod
+    def needs_encoding(track, now):
+        if track.last_encoded is None:
+            return True
+        interval = TRACK_REVERIFY_INTERVAL if track.user is not None else TRACK_UNKNOWN_RETRY
+        return now - track.last_encoded >= interval
@@ -4,4 +4,6 @@ from . import views
 
 urlpatterns = [
     path('usb-camera/', views.usb_camera_view, name='usb_camera_view'),
+    path('camera/stats/', views.camera_stats_view, name='camera_stats'),
+    path('camera/<int:camera_id>/regions/', views.camera_regions_view, name='camera_regions'),
 ]
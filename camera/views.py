@@ -1,8 +1,14 @@
 #camera/views.py
 
+import json
+
 import cv2
+from django.http import JsonResponse
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
+
+from camera.models import CameraSettings
 
 def get_usb_cameras(max_cams=5):
     cams = []
@@ -16,6 +22,10 @@ def get_usb_cameras(max_cams=5):
 @login_required(login_url='login')
 def usb_camera_view(request):
     cameras = get_usb_cameras()
+    regions = {
+        s.device_index: s.detection_regions
+        for s in CameraSettings.objects.filter(device_index__in=[c['id'] for c in cameras])
+    }
     breadcrumbs = [
         {'name': 'Bosh sahifa', 'url': '/'},
         {'name': 'Kameralar', 'url': '/cameras/list/'},
@@ -23,5 +33,35 @@ def usb_camera_view(request):
     ]
     return render(request, 'cameras/usb_camera.html', {
         'cameras': cameras,
+        'camera_regions': {str(c['id']): regions.get(c['id'], []) for c in cameras},
         'breadcrumbs': breadcrumbs
     })
+
+@login_required(login_url='login')
+def camera_stats_view(request):
+    """Ochiq kameralar pipeline metrikalari (motion gate skip ratio va h.k.)"""
+    from camera.recorder import ATTENDANCE_BUFFER
+    from camera.tasks import PHOTO_WRITER, camera_stats
+    return JsonResponse({
+        "cameras": camera_stats(),
+        "attendance": ATTENDANCE_BUFFER.snapshot(),
+        "photos": PHOTO_WRITER.snapshot(),
+    })
+
+@login_required(login_url='login')
+@require_POST
+def camera_regions_view(request, camera_id):
+    """
+    USB kamera sahifasidan aniqlash hududlarini (ROI) saqlaydi.
+    Body: {"regions": [[x1, y1, x2, y2], ...]} — bo‘sh ro‘yxat → butun kadr
+    """
+    try:
+        regions = CameraSettings.clean_regions(json.loads(request.body or b"{}").get("regions", []))
+    except (ValueError, TypeError, AttributeError) as e:
+        return JsonResponse({"status": "error", "error": str(e)}, status=400)
+
+    settings, _ = CameraSettings.objects.get_or_create(device_index=camera_id)
+    settings.detection_regions = regions
+    # Ochiq pipeline ga camera.signals orqali qo‘llanadi
+    settings.save(update_fields=['detection_regions', 'updated_at'])
+    return JsonResponse({"status": "ok", "regions": regions})
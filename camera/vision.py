@@ -0,0 +1,114 @@
+# camera/vision.py — og‘ir dlib ishlari (executor ichida bajariladi)
+#
+# Bu modul Django ni import qilmaydi: ProcessPoolExecutor ishchilari
+# faqat shu funksiyalarni chaqiradi, shuning uchun ular yengil va pickle qilinadigan bo‘lishi kerak.
+
+import cv2
+import face_recognition
+import numpy as np
+
+from camera.detectors import get_detector
+from camera.tracking import iou_matrix
+
+
+def locate_faces(rgb_small, detector="hog"):
+    """Kichraytirilgan RGB kadrdagi yuzlar: [(top, right, bottom, left), ...]"""
+    return get_detector(detector).detect(rgb_small)
+
+
+# ============================
+# YUZ SIFATI — encodingdan oldin arzon tekshiruv
+# ============================
+# Kichraytirilgan veb-kamera yuzlarida Laplacian dispersiyasi odatda 30-80 → 60 dan yuqori "aniq" hisoblanadi
+QUALITY_BLUR_REF = 60.0                  # Laplacian dispersiyasi shundan yuqori → to‘liq aniq
+QUALITY_BRIGHTNESS_RANGE = (60, 200)     # Shu oraliqdagi o‘rtacha yorug‘lik → ideal
+QUALITY_BRIGHTNESS_LIMITS = (20, 245)    # Bundan tashqarida → 0
+QUALITY_MAX_YAW = 0.6                    # Burun ko‘zlar o‘rtasidan ko‘z oralig‘ining shuncha qismiga siljisa → profil
+QUALITY_WEIGHTS = (0.4, 0.3, 0.3)        # (aniqlik, yorug‘lik, burilish) — vaznli geometrik o‘rtacha
+
+
+def face_quality(crop_rgb, location, with_pose=True):
+    """
+    Yuz bo‘lagi sifati: sharpness (xiralik), brightness (yorug‘lik), pose (burilish) — har biri 0..1.
+    Umumiy ball — vaznli geometrik o‘rtacha: biroz xira, lekin to‘g‘ri qaragan yuz o‘tadi,
+    biror komponent 0 bo‘lsa (qop-qorong‘i, profil) ball ham 0.
+    with_pose=False → landmark (dlib) hisoblanmaydi, ball aniqlik va yorug‘likdan.
+    """
+    t, r, b, l = location
+    gray = cv2.cvtColor(crop_rgb[t:b, l:r], cv2.COLOR_RGB2GRAY)
+    if gray.size == 0:
+        return {"score": 0.0, "sharpness": 0.0, "brightness": 0.0, "pose": 0.0}
+
+    sharpness = min(1.0, cv2.Laplacian(gray, cv2.CV_64F).var() / QUALITY_BLUR_REF)
+
+    mean = float(gray.mean())
+    (low, high), (floor, ceil) = QUALITY_BRIGHTNESS_RANGE, QUALITY_BRIGHTNESS_LIMITS
+    if mean < low:
+        brightness = max(0.0, (mean - floor) / (low - floor))
+    elif mean > high:
+        brightness = max(0.0, (ceil - mean) / (ceil - high))
+    else:
+        brightness = 1.0
+
+    if not with_pose:
+        w_sharp, w_bright, _ = QUALITY_WEIGHTS
+        score = sharpness ** (w_sharp / (w_sharp + w_bright)) * brightness ** (w_bright / (w_sharp + w_bright))
+        return {"score": round(score, 3), "sharpness": round(sharpness, 3), "brightness": round(brightness, 3), "pose": None}
+
+    pose = 0.0
+    landmarks = face_recognition.face_landmarks(crop_rgb, [location], model="small")
+    if landmarks:
+        points = landmarks[0]
+        left_eye = np.mean(points["left_eye"], axis=0)
+        right_eye = np.mean(points["right_eye"], axis=0)
+        nose = np.mean(points["nose_tip"], axis=0)
+        eye_dist = np.linalg.norm(right_eye - left_eye)
+        if eye_dist > 0:
+            yaw = abs(nose[0] - (left_eye[0] + right_eye[0]) / 2) / eye_dist
+            pose = max(0.0, 1.0 - yaw / QUALITY_MAX_YAW)
+
+    w_sharp, w_bright, w_pose = QUALITY_WEIGHTS
+    return {
+        "score": round(sharpness ** w_sharp * brightness ** w_bright * pose ** w_pose, 3),
+        "sharpness": round(sharpness, 3),
+        "brightness": round(brightness, 3),
+        "pose": round(pose, 3),
+    }
+
+
+def locate_faces_in_regions(rgb_small, regions, detector="hog"):
+    """
+    Faqat berilgan hududlar (ROI) ichida qidiradi.
+    regions — kichik kadr pikselida [(x1, y1, x2, y2), ...]; natija butun kadr koordinatalarida.
+    Hududlar ustma-ust tushsa, takroriy yuzlar olib tashlanadi.
+    """
+    backend = get_detector(detector)
+    locations = []
+    for x1, y1, x2, y2 in regions:
+        crop = rgb_small[y1:y2, x1:x2]
+        if crop.size == 0:
+            continue
+        for t, r, b, l in backend.detect(crop):
+            location = (t + y1, r + x1, b + y1, l + x1)
+            if locations and iou_matrix([location], locations).max() > 0.5:
+                continue
+            locations.append(location)
+    return locations
+
+
+def encode_face_crops(items, min_quality=0.0):
+    """
+    Kaskadning ikkinchi bosqichi: sifat tekshiruvi + encoding kadr bo‘laklaridan.
+    items — [(crop_rgb, (top, right, bottom, left)), ...], joylashuv crop ichidagi koordinatada.
+    Natija: [(quality, encoding yoki None), ...] — sifati past yuz encoding qilinmaydi.
+    min_quality <= 0 → filtr o‘chiq: landmark bosqichi o‘tkazib yuboriladi (best-shot uchun
+    aniqlik bahosi baribir hisoblanadi, u arzon).
+    """
+    results = []
+    for crop, location in items:
+        quality = face_quality(crop, location, with_pose=min_quality > 0)
+        if quality["score"] < min_quality:
+            results.append((quality, None))
+            continue
+        results.append((quality, face_recognition.face_encodings(crop, [location])[0]))
+    return results
@@ -31,7 +31,7 @@ class CustomUserAdmin(admin.ModelAdmin):
         }),
         (_("Identifikatsiya"), {
             "fields": (
-                "employee_id_number", "student_id_number", "year_of_enter",
+                "employee_id_number", "student_id_number", "year_of_enter", "face_threshold",
             )
         }),
         (_("Bo‘lim va lavozim"), {
@@ -71,13 +71,13 @@ class FaceEncodingAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "user_full_name", "face_image_preview", "created_at")
     list_filter = ("created_at", "user__role")
     search_fields = ("user__full_name", "user__username", "user__email")
-    readonly_fields = ("created_at", "face_image_preview", "encoding_data")
+    readonly_fields = ("created_at", "face_image_preview", "encoding_preview", "model_tag")
     list_per_page = 20
 
     fieldsets = (
         (_("Foydalanuvchi"), {"fields": ("user",)}),
         (_("Yuz ma’lumoti"), {
-            "fields": ("face_image_preview", "encoding_data")
+            "fields": ("face_image_preview", "encoding_preview", "model_tag")
         }),
         (_("Tizim"), {"fields": ("created_at",)}),
     )
@@ -93,4 +93,11 @@ class FaceEncodingAdmin(admin.ModelAdmin):
                 obj.user.image.url
             )
         return "–"
-    face_image_preview.short_description = _("Rasm")
\ No newline at end of file
+    face_image_preview.short_description = _("Rasm")
+
+    def encoding_preview(self, obj):
+        if not obj.encoding:
+            return "–"
+        vec = obj.vector
+        return f"[{', '.join(f'{v:.4f}' for v in vec[:6])}, …] ({vec.shape[0]} × float32)"
+    encoding_preview.short_description = _("Yuz encoding ma’lumoti")
\ No newline at end of file
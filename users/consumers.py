@@ -153,10 +153,8 @@ class FaceEncodingConsumer(AsyncWebsocketConsumer):
 
     def save_encoding(self, user, encoding):
         from users.models import FaceEncoding
-        FaceEncoding.objects.update_or_create(
-            user=user,
-            defaults={"encoding_data": encoding}
-        )
+        # Yangi shablon qo‘shiladi (eski encoding ustiga yozilmaydi), eng eskilari K dan oshsa o‘chadi
+        FaceEncoding.add_template(user, encoding)
         print(f"[WS] Encoding saved for user_id={user.id}")
 
     async def send_json(self, content):
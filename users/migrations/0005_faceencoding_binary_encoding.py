@@ -0,0 +1,78 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:00
+#
+# encoding_data (JSON, 128 ta Python float) → encoding (normallangan float32, 512 bayt)
+
+import numpy as np
+from django.db import migrations, models
+
+DIMENSION = 128
+
+
+def json_to_binary(apps, schema_editor):
+    FaceEncoding = apps.get_model('users', 'FaceEncoding')
+    broken = []
+    batch = []
+    for fe in FaceEncoding.objects.only('id', 'encoding_data').iterator(chunk_size=2000):
+        vec = np.asarray(fe.encoding_data or [], dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vec) if vec.shape == (DIMENSION,) else 0
+        if not norm:
+            broken.append(fe.id)
+            continue
+        fe.encoding = (vec / norm).astype(np.float32).tobytes()
+        batch.append(fe)
+        if len(batch) >= 2000:
+            FaceEncoding.objects.bulk_update(batch, ['encoding'])
+            batch = []
+    if batch:
+        FaceEncoding.objects.bulk_update(batch, ['encoding'])
+    # 128 o‘lchamli bo‘lmagan yozuvlar galereyaga hech qachon tushmagan → o‘chiriladi
+    if broken:
+        FaceEncoding.objects.filter(id__in=broken).delete()
+
+
+def binary_to_json(apps, schema_editor):
+    FaceEncoding = apps.get_model('users', 'FaceEncoding')
+    batch = []
+    for fe in FaceEncoding.objects.only('id', 'encoding').iterator(chunk_size=2000):
+        fe.encoding_data = np.frombuffer(fe.encoding, dtype=np.float32).tolist()
+        batch.append(fe)
+        if len(batch) >= 2000:
+            FaceEncoding.objects.bulk_update(batch, ['encoding_data'])
+            batch = []
+    if batch:
+        FaceEncoding.objects.bulk_update(batch, ['encoding_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_faceencoding_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='faceencoding',
+            name='encoding',
+            field=models.BinaryField(null=True, verbose_name='Yuz encoding ma’lumoti (float32)'),
+        ),
+        migrations.AddField(
+            model_name='faceencoding',
+            name='model_tag',
+            field=models.CharField(db_index=True, default='dlib-resnet-128-v1', max_length=32, verbose_name='Encoding modeli'),
+        ),
+        migrations.AlterField(
+            model_name='faceencoding',
+            name='encoding_data',
+            field=models.JSONField(null=True, verbose_name='Yuz encoding ma’lumoti'),
+        ),
+        migrations.RunPython(json_to_binary, binary_to_json),
+        migrations.RemoveField(
+            model_name='faceencoding',
+            name='encoding_data',
+        ),
+        migrations.AlterField(
+            model_name='faceencoding',
+            name='encoding',
+            field=models.BinaryField(verbose_name='Yuz encoding ma’lumoti (float32)'),
+        ),
+    ]
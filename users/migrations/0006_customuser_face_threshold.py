@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_faceencoding_binary_encoding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='face_threshold',
+            field=models.FloatField(blank=True, help_text='Bo‘sh → umumiy FACE_THRESHOLD. O‘xshash yuzli foydalanuvchilar uchun qat’iyroq (masalan 0.40)', null=True, verbose_name='Yuz masofasi chegarasi'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 #users/models.py
 
+import numpy as np
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
@@ -46,6 +47,13 @@ class CustomUser(AbstractUser):
     education_year = models.CharField(max_length=50, verbose_name=_("O‘quv yili"), blank=True, null=True)
     gpa = models.DecimalField(max_digits=4, decimal_places=2, verbose_name=_("O‘rtacha GPA"), blank=True, null=True)
 
+    # yuzni tanish
+    face_threshold = models.FloatField(
+        blank=True, null=True,
+        verbose_name=_("Yuz masofasi chegarasi"),
+        help_text=_("Bo‘sh → umumiy FACE_THRESHOLD. O‘xshash yuzli foydalanuvchilar uchun qat’iyroq (masalan 0.40)")
+    )
+
     # status va vaqt
     active = models.BooleanField(default=True, verbose_name=_("Faol"))
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Yaratilgan vaqt"))
@@ -62,15 +70,55 @@ class CustomUser(AbstractUser):
 class FaceEncoding(models.Model):
     """
     Foydalanuvchi yuz ma’lumotlarini saqlovchi model.
-    Bir foydalanuvchiga bir yoki bir nechta encoding yozuvi tegishli bo‘lishi mumkin.
+    Bir foydalanuvchiga MAX_TEMPLATES tagacha encoding (shablon) tegishli bo‘ladi —
+    kamera galereyasi ulardan foydalanuvchi markazini (centroid) hisoblaydi.
+    Encoding L2 normallangan float32 baytlar ko‘rinishida saqlanadi (128 × 4 = 512 bayt).
     """
+    DIMENSION = 128
+    MODEL_DLIB_128 = "dlib-resnet-128-v1"
+    MAX_TEMPLATES = 5
+
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="face_encodings", verbose_name=_("Foydalanuvchi"))
-    encoding_data = models.JSONField(verbose_name=_("Yuz encoding ma’lumoti"))
+    encoding = models.BinaryField(verbose_name=_("Yuz encoding ma’lumoti (float32)"))
+    model_tag = models.CharField(
+        max_length=32,
+        default=MODEL_DLIB_128,
+        db_index=True,
+        verbose_name=_("Encoding modeli")
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Yaratilgan vaqt"))
+    # Kamera galereyasi faqat shu vaqtdan keyin o‘zgarganlarni qayta yuklaydi
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name=_("Yangilangan vaqt"))
 
     def __str__(self):
         return f"{self.user.full_name or self.user.username} — {self.created_at.strftime('%Y-%m-%d %H:%M')}"
 
+    @classmethod
+    def pack(cls, vector):
+        """Encoding (list yoki ndarray) → normallangan float32 baytlar"""
+        vec = np.asarray(vector, dtype=np.float32).reshape(-1)
+        if vec.shape != (cls.DIMENSION,):
+            raise ValueError(f"Encoding o‘lchami {cls.DIMENSION} bo‘lishi kerak, {vec.shape[0]} berildi")
+        norm = np.linalg.norm(vec)
+        if norm == 0:
+            raise ValueError("Nol vektorni normallab bo‘lmaydi")
+        return (vec / norm).astype(np.float32).tobytes()
+
+    @classmethod
+    def add_template(cls, user, vector, max_templates=MAX_TEMPLATES):
+        """Yangi shablon qo‘shadi, eng eskilari MAX_TEMPLATES dan oshsa o‘chiriladi"""
+        template = cls.objects.create(user=user, encoding=cls.pack(vector))
+        newest_first = cls.objects.filter(user=user, model_tag=template.model_tag).order_by("-created_at", "-id")
+        stale_ids = list(newest_first.values_list("id", flat=True)[max_templates:])
+        if stale_ids:
+            # queryset.delete() post_delete signalini yuboradi → galereyadan ham chiqadi
+            cls.objects.filter(id__in=stale_ids).delete()
+        return template
+
+    @property
+    def vector(self):
+        return np.frombuffer(self.encoding, dtype=np.float32)
+
     class Meta:
         verbose_name = _("Yuz ma’lumoti")
         verbose_name_plural = _("Yuz ma’lumotlari")
\ No newline at end of file
@@ -1,14 +1,62 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
+from django.utils import timezone
 from django.conf import settings
 from users.models import CustomUser, FaceEncoding
 from users.tasks import create_face_encoding  # Celery task
 
+# Galereyadagi Identity shu ustunlardan quriladi (camera.identities.IDENTITY_FIELDS)
+GALLERY_USER_FIELDS = (
+    "username", "full_name", "role", "student_id_number", "employee_id_number",
+    "department_name", "group_name", "face_threshold",
+)
+_MISSING = object()
+
+
+def gallery_values(instance):
+    """Yuklangan galereya ustunlari (only() / defer() bilan qoldirilganlari kirmaydi — so‘rov yuborilmaydi)"""
+    return {field: instance.__dict__[field] for field in GALLERY_USER_FIELDS if field in instance.__dict__}
+
+
+@receiver(post_init, sender=CustomUser)
+def remember_gallery_fields(sender, instance, **kwargs):
+    """DB dan o‘qilgan qiymatlar — post_save da solishtirish uchun (saqlashdan oldin qo‘shimcha SELECT yo‘q)"""
+    instance._gallery_before = gallery_values(instance)
+
+
+def gallery_fields_changed(instance, update_fields=None):
+    """update_fields da galereya ustuni yo‘q bo‘lsa (masalan last_login) solishtirilmaydi ham"""
+    fields = GALLERY_USER_FIELDS if update_fields is None else set(update_fields) & set(GALLERY_USER_FIELDS)
+    before, after = getattr(instance, "_gallery_before", {}), gallery_values(instance)
+    return any(before.get(field, _MISSING) != after.get(field, _MISSING) for field in fields)
+
+
 @receiver(post_save, sender=CustomUser)
-def enqueue_face_encoding(sender, instance, created, **kwargs):
+def enqueue_face_encoding(sender, instance, created, update_fields=None, **kwargs):
     """
     Har safar foydalanuvchi rasm yuklasa,
     encoding yaratish Celery orqali background-da bajariladi.
     """
     if instance.image and instance.image.name:
         create_face_encoding.delay(instance.id)
+
+    # Ism, rol, bo‘lim yoki face_threshold o‘zgargan → galereya (barcha jarayonlarda)
+    # updated_at watermark orqali shu foydalanuvchi yozuvini qayta o‘qiydi.
+    # Boshqa saqlashlar (last_login, HEMIS sinxronida o‘zgarmagan yozuv) galereyaga tegmaydi
+    if not created and gallery_fields_changed(instance, update_fields):
+        FaceEncoding.objects.filter(user_id=instance.id).update(updated_at=timezone.now())
+    # Keyingi saqlash shu holat bilan solishtiriladi
+    instance._gallery_before = gallery_values(instance)
+
+
+@receiver(post_save, sender=FaceEncoding)
+def face_encoding_saved(sender, instance, **kwargs):
+    """Kamera galereyasi keyingi yangilanishda shu qatorni oladi (to‘liq qayta yuklamasdan)"""
+    from camera.gallery import GALLERY
+    GALLERY.mark_changed(instance.id)
+
+
+@receiver(post_delete, sender=FaceEncoding)
+def face_encoding_deleted(sender, instance, **kwargs):
+    from camera.gallery import GALLERY
+    GALLERY.mark_changed(instance.id, deleted=True)
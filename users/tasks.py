@@ -41,10 +41,7 @@ def create_face_encoding(user_id):
             return f"[WARN] ID {user_id} — Yuz topilmadi"
 
         # Encoding yaratish
-        FaceEncoding.objects.create(
-            user=user,
-            encoding_data=encodings[0].tolist()
-        )
+        FaceEncoding.add_template(user, encodings[0])
         return f"[OK] ID {user_id} — encoding yaratildi"
 
     except Exception as e:
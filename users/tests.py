@@ -1,3 +1,42 @@
 from django.test import TestCase
+from django.utils import timezone
 
-# Create your tests here.
+from users.models import CustomUser, FaceEncoding
+
+
+class GalleryFieldsSignalTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create(username="ali", full_name="Ali Valiyev")
+        self.encoding = FaceEncoding.objects.create(user=user, encoding=FaceEncoding.pack([1.0] * 128))
+        self.stamp = self.encoding.updated_at
+        self.user = CustomUser.objects.get(pk=user.pk)
+
+    def assert_touched(self, touched):
+        self.encoding.refresh_from_db()
+        self.assertEqual(self.encoding.updated_at > self.stamp, touched)
+
+    def test_rename_touches_encodings_without_select(self):
+        self.user.full_name = "Ali Karimov"
+        # UPDATE users + UPDATE face encodings — oldingi qiymat post_init da olingan, SELECT yo‘q
+        with self.assertNumQueries(2):
+            self.user.save()
+        self.assert_touched(True)
+
+    def test_unchanged_save_does_not_touch(self):
+        with self.assertNumQueries(1):
+            self.user.save()
+        self.assert_touched(False)
+
+    def test_update_fields_without_gallery_columns(self):
+        self.user.last_login = timezone.now()
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=["last_login"])
+        self.assert_touched(False)
+
+    def test_second_save_compares_with_saved_values(self):
+        self.user.face_threshold = 0.55
+        self.user.save()
+        self.stamp = FaceEncoding.objects.get(pk=self.encoding.pk).updated_at
+        with self.assertNumQueries(1):
+            self.user.save()
+        self.assert_touched(False)